@@ -0,0 +1,96 @@
+import argparse
+import time
+
+import torch
+from torch.optim import AdamW
+from torch.utils.data import DataLoader, RandomSampler
+from transformers import AutoTokenizer
+
+from src.utils.config_loader import config
+from src.data_layer.data_loader import DataLoader as MyDataLoader
+from src.services.preprocessing.pipeline import PreprocessingPipeline
+from src.services.tokenization import CachedTokenizer
+from src.core.dataset import HateSpeechDataset, build_data_loader
+from src.models.phobert_classifier import HateSpeechClassifier
+
+
+def run(loader, steps: int, train_step=None) -> dict:
+    """Time spent blocked on the loader vs. total, over `steps` batches (first batch excluded: worker start-up)."""
+    batches = iter(loader)
+    next(batches)
+    wait = compute = 0.0
+    done = 0
+    start = time.perf_counter()
+    while done < steps:
+        tick = time.perf_counter()
+        try:
+            batch = next(batches)
+        except StopIteration:
+            batches = iter(loader)
+            continue
+        fetched = time.perf_counter()
+        if train_step is not None:
+            train_step(batch)
+        wait += fetched - tick
+        compute += time.perf_counter() - fetched
+        done += 1
+    total = time.perf_counter() - start
+    return {"wait_s": wait, "compute_s": compute, "total_s": total, "wait_share": wait / total,
+            "batches_per_sec": done / total}
+
+
+def make_train_step(threads: int):
+    # Real optimization step on the training thread, so loader workers compete for the CPU as in main.py
+    torch.set_num_threads(threads)
+    model = HateSpeechClassifier(n_classes=2)
+    model.train()
+    optimizer = AdamW(model.parameters(), lr=2e-5)
+    criterion = torch.nn.CrossEntropyLoss()
+
+    def step(batch):
+        optimizer.zero_grad()
+        loss = criterion(model(batch['input_ids'], batch['attention_mask']), batch['labels'])
+        loss.backward()
+        optimizer.step()
+    return step
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark input pipeline: per-item vs batch-level, 0..N worker")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-len", type=int, default=128)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--prefetch-factor", type=int, default=2)
+    parser.add_argument("--with-model", action="store_true",
+                        help="Chạy bước train PhoBERT thật giữa các batch (đo thời gian chờ dữ liệu thực tế)")
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads(), help="Intra-op thread cho bước train")
+    args = parser.parse_args()
+
+    samples = PreprocessingPipeline().run(MyDataLoader().load_data(config.data.get('train_path')))
+    tokenizer = AutoTokenizer.from_pretrained("vinai/phobert-base-v2")
+    train_step = make_train_step(args.threads) if args.with_model else None
+
+    configs = [("per-item (cũ)", 0, False)] + [(f"batch, {w} worker", w, True) for w in args.workers]
+    results = []
+    for name, workers, batched in configs:
+        # Fresh cache per config: every run starts from the same cold state
+        dataset = HateSpeechDataset(samples, CachedTokenizer(tokenizer), max_len=args.max_len)
+        sampler = RandomSampler(dataset, generator=torch.Generator().manual_seed(42))
+        if batched:
+            loader = build_data_loader(dataset, sampler, args.batch_size, num_workers=workers,
+                                       prefetch_factor=args.prefetch_factor, persistent_workers=workers > 0)
+        else:
+            loader = DataLoader(dataset, batch_size=args.batch_size, sampler=sampler)
+        stats = run(loader, args.steps, train_step)
+        results.append((name, stats))
+        print(f"--> {name}: xong")
+
+    print(f"\n{'':<18} | {'batch/s':>8} | {'chờ dữ liệu':>11} | {'% thời gian chờ':>15}")
+    print("-" * 62)
+    for name, stats in results:
+        print(f"{name:<18} | {stats['batches_per_sec']:>8.2f} | {stats['wait_s']:>10.2f}s | {stats['wait_share']:>14.1%}")
+
+
+if __name__ == "__main__":
+    main()
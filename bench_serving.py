@@ -0,0 +1,141 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SAMPLE_TEXTS = [
+    "hôm nay trời đẹp quá",
+    "mày ngu vãi",
+    "sản phẩm dùng ổn, giao hàng nhanh",
+    "đồ óc chó, biến đi cho khuất mắt",
+]
+
+
+def child_pids(parent_pid: int):
+    """All direct children of parent_pid, found by scanning /proc (Linux)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # Field 4 is ppid; the command name (field 2) may contain spaces, so split after ')'
+                fields = f.read().rsplit(")", 1)[1].split()
+            if int(fields[1]) == parent_pid:
+                children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def memory_of(pid: int) -> dict:
+    """RSS counts shared weight pages in full for every worker; PSS splits them between sharers."""
+    result = {"rss_mb": 0.0, "pss_mb": 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    result["rss_mb"] = int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    result["pss_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return result
+
+
+def wait_ready(url: str, workers: int, timeout: float):
+    # The shared socket routes each probe to an arbitrary worker; require a streak of ready answers
+    deadline = time.time() + timeout
+    streak = 0
+    while time.time() < deadline:
+        try:
+            ok = requests.get(f"{url}/readyz", timeout=2).status_code == 200
+        except requests.RequestException:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= 4 * workers:
+            return
+        time.sleep(0.05 if ok else 0.5)
+    raise TimeoutError("Server không sẵn sàng kịp thời gian chờ")
+
+
+def load_test(url: str, concurrency: int, duration: float):
+    latencies = []
+    errors = 0
+    deadline = time.time() + duration
+
+    def client(i):
+        nonlocal errors
+        session = requests.Session()
+        n = i
+        while time.time() < deadline:
+            start = time.perf_counter()
+            r = session.post(f"{url}/predict", json={"text": SAMPLE_TEXTS[n % len(SAMPLE_TEXTS)]})
+            if r.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+            n += 1
+
+    start = time.time()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    elapsed = time.time() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RSS/PSS mỗi worker và throughput của API")
+    parser.add_argument("--mode", choices=["shared", "independent"], default="shared",
+                        help="shared: serve_shared.py; independent: uvicorn --workers (mỗi worker 1 bản model)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if args.mode == "shared":
+        cmd = [sys.executable, "serve_shared.py", "--workers", str(args.workers), "--port", str(args.port)]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "src.api.server:app",
+               "--workers", str(args.workers), "--port", str(args.port)]
+
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(url, args.workers, args.timeout)
+        stats = load_test(url, args.concurrency, args.duration)
+
+        # Measured after load so every weight page a worker touches is counted
+        pids = child_pids(server.pid) or [server.pid]
+        per_worker = [memory_of(pid) for pid in pids]
+        parent = memory_of(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    print(f"\n=== {args.mode.upper()} | {args.workers} worker | concurrency {args.concurrency} ===")
+    print(f"Throughput: {stats['rps']:.1f} req/s | p50 {stats['p50_ms']:.1f} ms | p95 {stats['p95_ms']:.1f} ms"
+          f" | lỗi {stats['errors']}")
+    print(f"Tiến trình cha: RSS {parent['rss_mb']:.0f} MB | PSS {parent['pss_mb']:.0f} MB")
+    for pid, mem in zip(pids, per_worker):
+        print(f"Worker {pid}: RSS {mem['rss_mb']:.0f} MB | PSS {mem['pss_mb']:.0f} MB")
+    total_pss = parent['pss_mb'] + sum(m['pss_mb'] for m in per_worker)
+    print(f"Tổng PSS (bộ nhớ thực sự dùng): {total_pss:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import time
+
+import numpy as np
+from transformers import AutoTokenizer
+
+from src.utils.config_loader import config
+from src.data_layer.data_loader import DataLoader as MyDataLoader
+from src.services.preprocessing.pipeline import PreprocessingPipeline
+from src.services.tokenization import CachedTokenizer
+
+
+def reference_encode(tokenizer, texts, max_len):
+    """The pre-existing path: one encode_plus call per text, as HateSpeechDataset used to do."""
+    input_ids = np.empty((len(texts), max_len), dtype=np.int64)
+    attention_mask = np.empty((len(texts), max_len), dtype=np.int64)
+    for row, text in enumerate(texts):
+        encoding = tokenizer.encode_plus(text, add_special_tokens=True, max_length=max_len,
+                                         padding='max_length', truncation=True, return_attention_mask=True)
+        input_ids[row] = encoding['input_ids']
+        attention_mask[row] = encoding['attention_mask']
+    return input_ids, attention_mask
+
+
+def cached_encode(tokenizer: CachedTokenizer, texts, max_len, batch_size):
+    parts = [tokenizer.encode_batch(texts[i:i + batch_size], max_len, return_tensors="np")
+             for i in range(0, len(texts), batch_size)]
+    return (np.concatenate([p['input_ids'] for p in parts]),
+            np.concatenate([p['attention_mask'] for p in parts]))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tokenizer có cache so với encode_plus trên ViHOS")
+    parser.add_argument("--data", default=None, help="CSV ViHOS (mặc định: data.train_path trong config.yaml)")
+    parser.add_argument("--max-len", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    parser.add_argument("--raw", action="store_true", help="Bỏ qua tiền xử lý (không chuẩn hóa teencode)")
+    args = parser.parse_args()
+
+    data_path = args.data or config.data.get('train_path')
+    samples = MyDataLoader().load_data(data_path)
+    if not args.raw:
+        samples = PreprocessingPipeline().run(samples)
+    texts = [str(s.text) for s in samples]
+    n_words = sum(len(t.split()) for t in texts)
+    print(f"--> {len(texts)} câu, {n_words} từ ({'thô' if args.raw else 'đã chuẩn hóa'})")
+
+    base = AutoTokenizer.from_pretrained("vinai/phobert-base-v2")
+    cached = CachedTokenizer(base, cache_size=args.cache_size)
+    if not cached.memoized:
+        print("⚠️ Tokenizer là bản fast: CachedTokenizer chỉ ủy quyền, không có cache để đo")
+
+    # Short warmup so one-off lazy setup in the tokenizer is not billed to the reference timing
+    reference_encode(base, texts[:1000], args.max_len)
+    (ref_ids, ref_mask), ref_seconds = timed(reference_encode, base, texts, args.max_len)
+
+    # Cold pass fills the word cache (epoch 1 / fresh server); warm pass is every later epoch
+    (cold_ids, cold_mask), cold_seconds = timed(cached_encode, cached, texts, args.max_len, args.batch_size)
+    cold_stats = cached.cache_stats()
+    (warm_ids, warm_mask), warm_seconds = timed(cached_encode, cached, texts, args.max_len, args.batch_size)
+
+    mismatches = [i for i in range(len(texts))
+                  if not (np.array_equal(ref_ids[i], cold_ids[i]) and np.array_equal(ref_mask[i], cold_mask[i])
+                          and np.array_equal(ref_ids[i], warm_ids[i]) and np.array_equal(ref_mask[i], warm_mask[i]))]
+
+    print(f"\n{'':<18} | {'giây':>8} | {'câu/s':>10} | {'tăng tốc':>8}")
+    print("-" * 54)
+    for name, seconds in (("encode_plus", ref_seconds), ("cache (lần đầu)", cold_seconds),
+                          ("cache (đã ấm)", warm_seconds)):
+        print(f"{name:<18} | {seconds:>8.2f} | {len(texts) / seconds:>10.0f} | {ref_seconds / seconds:>7.1f}x")
+
+    print(f"\nTỉ lệ trúng cache sau lần đầu: {cold_stats['hit_rate']:.1%} "
+          f"({cold_stats['size']} từ khác nhau, tối đa {cold_stats['max_size']})")
+    if mismatches:
+        print(f"❌ {len(mismatches)} câu khác kết quả tokenizer gốc, ví dụ dòng {mismatches[:5]}")
+        raise SystemExit(1)
+    print("✅ Kết quả khớp hoàn toàn với tokenizer gốc")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+from transformers import AutoTokenizer
+
+from src.utils.config_loader import config
+from src.data_layer.data_loader import DataLoader as MyDataLoader
+from src.data_layer.dedup import split_corpus
+from src.models.artifact import is_artifact
+from src.services.preprocessing.pipeline import PreprocessingPipeline
+from src.services.tokenization import CachedTokenizer
+from src.services.evaluation import BatchPlan, best_deployable, evaluate_checkpoints, write_best_checkpoint
+
+
+def find_checkpoints(directory: str, pattern: str):
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    # Exported artifacts are directories, found next to the .pth files
+    paths += sorted(os.path.join(directory, d) for d in os.listdir(directory)
+                    if is_artifact(os.path.join(directory, d)))
+    return paths
+
+
+def load_held_out(data_path: str = None):
+    """An explicit CSV is scored in full; otherwise the validation split main.py trains against."""
+    pipeline = PreprocessingPipeline()
+    samples = pipeline.run(MyDataLoader().load_data(data_path or config.data.get('train_path')))
+    if data_path is None:
+        # Same split (seed, dedup settings) as main.py, so no checkpoint is scored on its own training rows
+        _, samples, _ = split_corpus(samples, config.data.get('dedup'), test_size=0.2, random_state=42)
+    return [str(s.text) for s in samples], [int(s.label) for s in samples]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đánh giá song song mọi checkpoint và chọn checkpoint tốt nhất")
+    parser.add_argument("--dir", default="models", help="Thư mục chứa checkpoint (.pth và artifact)")
+    parser.add_argument("--pattern", default="*.pth")
+    parser.add_argument("--data", default=None, help="CSV held-out; mặc định là tập val của main.py")
+    parser.add_argument("--workers", type=int, default=2, help="Số tiến trình đánh giá song song")
+    parser.add_argument("--threads-per-worker", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-len", type=int, default=None, help="Mặc định: training.max_len trong config.yaml")
+    parser.add_argument("--output", default="models/leaderboard.json")
+    parser.add_argument("--no-mark", action="store_true", help="Không ghi models/best_checkpoint.json")
+    args = parser.parse_args()
+
+    paths = find_checkpoints(args.dir, args.pattern)
+    if not paths:
+        print(f"❌ Không có checkpoint nào trong {args.dir}")
+        return
+
+    texts, labels = load_held_out(args.data)
+    max_len = args.max_len or int(config.training.get('max_len', 128))
+    tokenizer = CachedTokenizer(AutoTokenizer.from_pretrained("vinai/phobert-base-v2"))
+
+    start = time.perf_counter()
+    plan = BatchPlan(texts, labels, tokenizer, max_len=max_len, batch_size=args.batch_size)
+    print(f"--> Tokenize {len(plan)} câu 1 lần ({time.perf_counter() - start:.1f}s); "
+          f"padding theo batch: {plan.padded_tokens} token thay vì {len(plan) * max_len}")
+
+    workers = min(args.workers, len(paths))
+    print(f"--> Đánh giá {len(paths)} checkpoint trên {workers} tiến trình...")
+    start = time.perf_counter()
+    leaderboard = evaluate_checkpoints(paths, plan, workers=workers, threads_per_worker=args.threads_per_worker)
+    print(f"--> Xong sau {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{'#':>2} | {'checkpoint':<28} | {'macro-F1':>8} | {'acc':>6} | {'ms/câu':>7} | {'p95 batch':>9} | ngưỡng tốt nhất")
+    print("-" * 100)
+    for rank, entry in enumerate(leaderboard, 1):
+        threshold = (f"{entry['best_threshold']:.2f} (F1 {entry['best_threshold_f1']:.4f})"
+                     if 'best_threshold' in entry else "-")
+        print(f"{rank:>2} | {entry['checkpoint']:<28} | {entry['macro_f1']:>8.4f} | {entry['accuracy']:>6.4f} | "
+              f"{entry['ms_per_sample']:>7.2f} | {entry['p95_batch_ms']:>7.1f}ms | {threshold}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"held_out_size": len(plan), "max_len": max_len, "leaderboard": leaderboard}, f, indent=2)
+    print(f"\n--> Leaderboard: {args.output}")
+
+    if not args.no_mark:
+        # Full-state training checkpoints are scored but never marked: the predictor serves weights only
+        best = best_deployable(leaderboard)
+        if best is None:
+            print("⚠️ Không có checkpoint nào dùng được cho serving (chỉ có ckpt_step_*.pt); "
+                  "hãy lưu trọng số epoch (.pth) hoặc export artifact trước")
+            return
+        if best is not leaderboard[0]:
+            print(f"⚠️ {leaderboard[0]['path']} là checkpoint huấn luyện đầy đủ, bỏ qua khi chọn checkpoint serving")
+        write_best_checkpoint(best)
+        print(f"--> Checkpoint tốt nhất cho serving: {best['path']} (models/best_checkpoint.json)")
+
+
+if __name__ == "__main__":
+    main()
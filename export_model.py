@@ -0,0 +1,64 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from src.models.artifact import export_artifact
+
+
+def measure_load(model_path: str):
+    """Child-process mode: build a predictor from scratch and report load time and peak RSS."""
+    start = time.perf_counter()
+    from src.services.predictor import HateSpeechPredictor
+    from src.utils.memory import peak_rss_mb
+
+    predictor = HateSpeechPredictor(model_path, device="cpu")
+    load_seconds = time.perf_counter() - start
+
+    # First prediction touches every weight page, so it belongs to the cold-start cost
+    predictor.predict("kiểm tra tốc độ khởi động")
+    first_predict_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "first_predict_seconds": first_predict_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def benchmark(checkpoint: str, artifact: str):
+    """Compare cold start of the legacy .pth path and the artifact path, each in a fresh interpreter."""
+    results = {}
+    for name, path in (("pth", checkpoint), ("artifact", artifact)):
+        out = subprocess.run([sys.executable, __file__, "--measure-load", path],
+                             capture_output=True, text=True, check=True)
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    print(f"\n{'':<10} | {'load (s)':>9} | {'1st predict (s)':>15} | {'peak RSS (MB)':>13}")
+    print("-" * 58)
+    for name, r in results.items():
+        print(f"{name:<10} | {r['load_seconds']:>9.2f} | {r['first_predict_seconds']:>15.2f} | {r['peak_rss_mb']:>13.0f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export checkpoint .pth thành artifact tự chứa (safetensors, mmap)")
+    parser.add_argument("--checkpoint", default="models/phobert_epoch_3.pth")
+    parser.add_argument("--out", default="models/phobert_artifact")
+    parser.add_argument("--max-len", type=int, default=128)
+    parser.add_argument("--benchmark", action="store_true", help="So sánh cold start .pth vs artifact")
+    parser.add_argument("--measure-load", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_load:
+        measure_load(args.measure_load)
+        return
+
+    export_artifact(args.checkpoint, args.out, max_len=args.max_len)
+    if args.benchmark:
+        benchmark(args.checkpoint, args.out)
+
+
+if __name__ == "__main__":
+    main()
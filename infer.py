@@ -1,13 +1,16 @@
 import torch
 from src.services.predictor import HateSpeechPredictor
+from src.services.evaluation import read_best_checkpoint
+from src.utils.config_loader import config
 
 
 def main():
-    # Chọn model Epoch 3 (Ngon nhất)
-    MODEL_PATH = "models/phobert_epoch_3.pth"
+    # Checkpoint được evaluate_checkpoints.py chọn; chưa chạy đánh giá thì dùng serving.model_path
+    serving_cfg = config.serving if config is not None else {}
+    MODEL_PATH = read_best_checkpoint() or serving_cfg.get("model_path", "models/phobert_epoch_3.pth")
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"--> Đang khởi tạo Predictor trên {device.upper()}...")
+    print(f"--> Đang khởi tạo Predictor từ {MODEL_PATH} trên {device.upper()}...")
 
     try:
         # Lưu ý: Model train với n_classes=2 thì lúc load cũng phải y hệt
@@ -1,17 +1,33 @@
+import argparse
+import json
+import os
+
 import torch
-from torch.utils.data import DataLoader
-from sklearn.model_selection import train_test_split
+from torch.utils.data import SequentialSampler
 from transformers import AutoTokenizer
 
 from src.utils.config_loader import config
 from src.data_layer.data_loader import DataLoader as MyDataLoader
+from src.data_layer.dedup import split_corpus
 from src.services.preprocessing.pipeline import PreprocessingPipeline
-from src.core.dataset import HateSpeechDataset
+from src.core.dataset import HateSpeechDataset, build_data_loader
+from src.services.tokenization import CachedTokenizer
 from src.models.phobert_classifier import HateSpeechClassifier
 from src.services.trainer import HateSpeechTrainer
+from src.services.memory_probe import MemoryProbe
+from src.services.checkpointing import CheckpointManager, ResumableSampler
+from src.services.telemetry import StepTelemetry
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Huấn luyện PhoBERT phát hiện ngôn từ độc hại")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None,
+                        help="Tiếp tục từ checkpoint (mặc định: checkpoint mới nhất trong training.checkpoint_dir)")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
     print("=== HỆ THỐNG HUẤN LUYỆN HATE SPEECH DETECTION (3 CLASSES) ===")
 
     # Config must be loaded before proceeding; silently abort if missing to avoid partial runs
@@ -28,38 +44,105 @@ def main():
     pipeline = PreprocessingPipeline()
     clean_data = pipeline.run(raw_data)
 
-    # Preserve class distribution across splits to keep evaluation stable on imbalanced data
-    labels = [int(d.label) for d in clean_data]
-    train_data, val_data = train_test_split(
-        clean_data,
-        test_size=0.2,
-        random_state=42,
-        stratify=labels
-    )
+    # Stratified split; with data.dedup enabled, near-duplicates are collapsed (or kept on one side of the
+    # split) first, so validation never scores a copy of a training row
+    train_data, val_data, dedup_report = split_corpus(clean_data, config.data.get('dedup'), test_size=0.2,
+                                                      random_state=42)
+    if dedup_report:
+        print(f"--> [Dedup] Bỏ {dedup_report['rows_removed']}/{dedup_report['rows_in']} dòng trùng gần đúng "
+              f"({dedup_report['duplicate_groups']} nhóm, {dedup_report['label_conflicts']} nhóm lệch nhãn), "
+              f"train bớt {dedup_report['train_rows_saved_per_epoch']} dòng/epoch")
     print(f"--> Dữ liệu: Train ({len(train_data)}) | Val ({len(val_data)})")
 
-    # Tokenizer tied to model family; must match PhoBERT checkpoints used by the classifier
-    print("--> Đang tải Tokenizer...")
-    tokenizer = AutoTokenizer.from_pretrained("vinai/phobert-base-v2")
+    # Sizing comes from config so smaller nodes can lower it without editing code
+    train_cfg = config.training
+    batch_size = int(train_cfg.get('batch_size', 16))
+    max_len = int(train_cfg.get('max_len', 128))
 
-    train_dataset = HateSpeechDataset(train_data, tokenizer)
-    val_dataset = HateSpeechDataset(val_data, tokenizer)
+    checkpoint_dir = train_cfg.get('checkpoint_dir', 'models/checkpoints')
+    checkpoint_manager = CheckpointManager(checkpoint_dir, keep_last=int(train_cfg.get('keep_last_checkpoints', 3)))
+    run_config_path = os.path.join(checkpoint_dir, 'run_config.json')
 
-    # Batch size trades memory for throughput; adjust externally based on hardware constraints
-    BATCH_SIZE = 16
-    train_loader = DataLoader(train_dataset, batch_size=BATCH_SIZE, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=BATCH_SIZE)
+    resume_path = None
+    if args.resume:
+        resume_path = checkpoint_manager.latest() if args.resume == "latest" else args.resume
+        if resume_path is None:
+            print(f"❌ Không có checkpoint nào trong {checkpoint_dir}")
+            return
 
-    # Model and trainer are instantiated per run; checkpoints captured every epoch for reproducibility
+    # Model is built before the DataLoaders so the memory probe can size them
     print("--> Đang khởi tạo Model...")
-    model = HateSpeechClassifier(n_classes=2)
-    trainer = HateSpeechTrainer(model, train_loader, val_loader, device=device)
+    model = HateSpeechClassifier(
+        n_classes=2,
+        dropout=float(train_cfg.get('dropout', 0.3)),
+        gradient_checkpointing=bool(train_cfg.get('gradient_checkpointing', False))
+    )
+
+    # Optional probe: pick the largest batch/max_len that fits the RAM budget instead of guessing
+    budget_mb = MemoryProbe.resolve_budget(train_cfg.get('memory_budget_mb'))
+    if resume_path and os.path.exists(run_config_path):
+        # A resumed run must replay the original batch geometry, not re-probe on possibly different load
+        with open(run_config_path, "r", encoding="utf-8") as f:
+            run_config = json.load(f)
+        batch_size, max_len = run_config['batch_size'], run_config['max_len']
+        print(f"--> Dùng lại batch_size={batch_size}, max_len={max_len} của lần chạy trước")
+    elif budget_mb is not None:
+        print(f"--> Đang dò cấu hình vừa ngân sách bộ nhớ {budget_mb:.0f}MB...")
+        probe = MemoryProbe(model, budget_mb, device=device)
+        candidate_batches = [1, 2, 4, 8, 16, 32, 64]
+        # max_len itself is always a candidate, so a configured length below 32 (or off the grid) still probes
+        candidate_lens = sorted({l for l in (32, 64, 96, 128, 192, 256) if l <= max_len} | {max_len})
+        batch_size, max_len, peak_mb = probe.find_max_config(candidate_batches, candidate_lens)
+        print(f"--> Chọn batch_size={batch_size}, max_len={max_len} (peak ~{peak_mb:.0f}MB)")
+
+    if not resume_path:
+        with open(run_config_path, "w", encoding="utf-8") as f:
+            json.dump({'batch_size': batch_size, 'max_len': max_len}, f)
+
+    # Tokenizer tied to model family; must match PhoBERT checkpoints used by the classifier
+    print("--> Đang tải Tokenizer...")
+    tokenizer = CachedTokenizer(AutoTokenizer.from_pretrained("vinai/phobert-base-v2"))
+
+    train_dataset = HateSpeechDataset(train_data, tokenizer, max_len=max_len)
+    val_dataset = HateSpeechDataset(val_data, tokenizer, max_len=max_len)
+
+    # Batches are tokenized whole in loader workers, prefetched ahead of the training step
+    loader_cfg = train_cfg.get('loader') or {}
+    loader_kwargs = dict(
+        num_workers=int(loader_cfg.get('num_workers', 0)),
+        prefetch_factor=int(loader_cfg.get('prefetch_factor', 2)),
+        persistent_workers=bool(loader_cfg.get('persistent_workers', True)),
+        pin_memory=bool(loader_cfg.get('pin_memory', False)) and device == "cuda",
+    )
+    # Epoch-seeded shuffling that can fast-forward, so --resume continues mid-epoch on the same batches
+    train_loader = build_data_loader(train_dataset, ResumableSampler(train_dataset, seed=42), batch_size,
+                                     **loader_kwargs)
+    val_loader = build_data_loader(val_dataset, SequentialSampler(val_dataset), batch_size, **loader_kwargs)
 
     # Keep a short training horizon in the script; longer runs should be configured via experiment tooling
-    EPOCHS = 3
-    print(f"\n--> BẮT ĐẦU TRAIN ({EPOCHS} epochs)...")
+    EPOCHS = int(train_cfg.get('epochs', 3))
+
+    # Full training state is checkpointed every N steps in the background; epoch weights are still saved below
+    use_linear_schedule = train_cfg.get('lr_schedule') == 'linear'
+    telemetry_cfg = train_cfg.get('telemetry') or {}
+    telemetry = None
+    if telemetry_cfg.get('enabled'):
+        telemetry = StepTelemetry(telemetry_cfg.get('path', 'models/telemetry.jsonl'),
+                                  every=int(telemetry_cfg.get('every', 10)))
+    trainer = HateSpeechTrainer(
+        model, train_loader, val_loader, device=device,
+        lr=float(train_cfg.get('lr', 2e-5)),
+        num_training_steps=EPOCHS * len(train_loader) if use_linear_schedule else None,
+        warmup_ratio=float(train_cfg.get('warmup_ratio', 0.0)),
+        checkpoint_manager=checkpoint_manager,
+        checkpoint_every=train_cfg.get('checkpoint_every'),
+        telemetry=telemetry
+    )
+
+    start_epoch = trainer.resume(resume_path) if resume_path else 1
+    print(f"\n--> BẮT ĐẦU TRAIN ({EPOCHS} epochs, từ epoch {start_epoch})...")
 
-    for epoch in range(1, EPOCHS + 1):
+    for epoch in range(start_epoch, EPOCHS + 1):
         train_loss, train_acc, train_f1 = trainer.train_one_epoch(epoch)
         val_loss, val_acc, val_f1 = trainer.evaluate()
 
@@ -71,6 +154,24 @@ def main():
         # Persist epoch-level checkpoints to enable later selection based on validation metrics
         trainer.save_model(f"models/phobert_epoch_{epoch}.pth")
 
+        # Taken after evaluation so a resumed run's RNG stream lines up with the uninterrupted one
+        trainer.save_checkpoint(epoch)
+
+    # Background writes must land before the process exits
+    checkpoint_manager.close()
+    if telemetry is not None:
+        telemetry.close()
+        print(f"--> Telemetry: {telemetry.path} (python summarize_telemetry.py {telemetry.path})")
+
+    if dedup_report and trainer.epoch_stats:
+        # Measured throughput turns the rows dedup removed into wall-clock time saved over the run
+        samples_per_sec = sum(s['samples_per_sec'] for s in trainer.epoch_stats) / len(trainer.epoch_stats)
+        dedup_report['samples_per_sec'] = samples_per_sec
+        dedup_report['train_seconds_saved'] = dedup_report['train_rows_saved_per_epoch'] * EPOCHS / samples_per_sec
+        with open("models/dedup_report.json", "w", encoding="utf-8") as f:
+            json.dump(dedup_report, f, indent=2)
+        print(f"--> [Dedup] Tiết kiệm ~{dedup_report['train_seconds_saved'] / 60:.1f} phút huấn luyện "
+              f"({EPOCHS} epoch); báo cáo: models/dedup_report.json")
     print("\n--> HOÀN TẤT HUẤN LUYỆN!")
 
 
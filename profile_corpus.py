@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+
+from src.utils.config_loader import config
+from src.services.corpus_stats import CorpusStats
+
+
+def print_report(summary: dict, top: int):
+    print(f"\n=== {summary['rows']} dòng | {summary['sentences']} câu | {summary['vocab_size']} từ vựng ===")
+
+    print("\n--- PHÂN BỐ NHÃN (0 = Clean, 1 = Toxic) ---")
+    total = sum(summary['labels'].values()) or 1
+    for label, count in summary['labels'].items():
+        print(f"Nhãn {label:>3}: {count:>7} ({count / total:.1%})")
+
+    if summary['tags']:
+        print("\n--- TAG (TOKEN-LEVEL) ---")
+        for tag, count in summary['tags']:
+            print(f"Tag: {tag:>5} | Count: {count}")
+
+    for name, key in (("Số ký tự / câu", "char_length"), ("Số từ / câu", "token_length")):
+        dist = summary[key]
+        if dist:
+            print(f"\n--- {name.upper()} ---")
+            print(" | ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}" for k, v in dist.items()))
+
+    print(f"\n--- TOP {top} TỪ NGHI TEENCODE CHƯA CÓ TRONG TỪ ĐIỂN ---")
+    for word, count in summary['teencode_suspects'][:top]:
+        print(f"{word}: {count} lần")
+
+    print(f"\n--- TOP {top} TỪ XUẤT HIỆN NHIỀU NHẤT ---")
+    for word, count in summary['top_words'][:top]:
+        print(f"{word}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Thống kê corpus trong một lượt đọc: từ vựng, teencode, tag, nhãn, độ dài câu")
+    parser.add_argument("paths", nargs="*", help="Các file CSV (mặc định: data.train_path trong config.yaml)")
+    parser.add_argument("--state", default="models/corpus_stats.json",
+                        help="File state; lần chạy sau chỉ đọc phần dữ liệu mới được nối thêm")
+    parser.add_argument("--rebuild", action="store_true", help="Bỏ state cũ, quét lại từ đầu")
+    parser.add_argument("--merge", nargs="+", default=[], metavar="STATE",
+                        help="Gộp thêm state của các corpus khác (vd. quét song song trên máy khác)")
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="In báo cáo dạng JSON")
+    args = parser.parse_args()
+
+    paths = args.paths or [config.data.get('train_path')]
+    stats = CorpusStats.load(args.state) if os.path.exists(args.state) and not args.rebuild else CorpusStats()
+    try:
+        for other in args.merge:
+            stats.merge(CorpusStats.load(other))
+        for path in paths:
+            new_rows = stats.update(path)
+            print(f"--> {path}: {new_rows} dòng mới")
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    stats.save(args.state)
+
+    summary = stats.summary(top=args.top)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print_report(summary, args.top)
+
+
+if __name__ == "__main__":
+    main()
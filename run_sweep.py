@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import time
+
+from transformers import AutoTokenizer
+
+from src.utils.config_loader import config
+from src.data_layer.data_loader import DataLoader as MyDataLoader
+from src.data_layer.dedup import kfold_corpus, split_corpus
+from src.services.preprocessing.pipeline import PreprocessingPipeline
+from src.services.tokenization import CachedTokenizer
+from src.services.sweep import (
+    SEARCH_SPACE, TokenizedCorpus, build_tasks, build_trials, resolve_layout, run_sweep, summarize_trials
+)
+
+
+def parse_grid(values):
+    """--set lr=2e-5,3e-5 --set max_len=64,128 -> {'lr': [2e-05, 3e-05], 'max_len': [64, 128]}"""
+    grid = {}
+    for item in values or []:
+        name, _, raw = item.partition("=")
+        grid[name] = [int(v) if name in ("max_len", "batch_size") else float(v) for v in raw.split(",")]
+    return grid
+
+
+def main():
+    sweep_cfg = (config.training.get('sweep') or {}) if config else {}
+    parser = argparse.ArgumentParser(description="Sweep siêu tham số / k-fold song song trên một corpus đã tokenize")
+    parser.add_argument("--set", action="append", metavar="THAM_SỐ=A,B,...",
+                        help=f"Ghi đè lưới trong config, vd. --set lr=2e-5,5e-5 (hỗ trợ: {', '.join(SEARCH_SPACE)})")
+    parser.add_argument("--folds", type=int, default=int(sweep_cfg.get('folds', 1)),
+                        help="1: tách train/val như main.py; k>=2: stratified k-fold")
+    parser.add_argument("--epochs", type=int, default=int(sweep_cfg.get('epochs', 3)))
+    parser.add_argument("--workers", type=int, default=sweep_cfg.get('workers'),
+                        help="Số trial chạy song song; mặc định theo số core (~4 thread/trial)")
+    parser.add_argument("--threads-per-worker", type=int, default=sweep_cfg.get('threads_per_worker'))
+    parser.add_argument("--no-early-stop", action="store_true", help="Chạy đủ epoch cho mọi trial")
+    parser.add_argument("--output", default=sweep_cfg.get('output_path', "models/sweep_results.json"))
+    args = parser.parse_args()
+
+    if config is None: return
+    train_cfg = config.training
+    defaults = {
+        "lr": float(train_cfg.get('lr', 2e-5)),
+        "max_len": int(train_cfg.get('max_len', 128)),
+        "dropout": float(train_cfg.get('dropout', 0.3)),
+        "batch_size": int(train_cfg.get('batch_size', 16)),
+    }
+    grid = dict(sweep_cfg.get('grid') or {})
+    grid.update(parse_grid(args.set))
+    try:
+        trials = build_trials(grid, defaults)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    # Raw CSV -> preprocessing -> dedup -> tokenization happens once for the whole sweep
+    start = time.perf_counter()
+    samples = PreprocessingPipeline().run(MyDataLoader().load_data(config.data.get('train_path')))
+    if args.folds >= 2:
+        samples, folds, _ = kfold_corpus(samples, config.data.get('dedup'), n_splits=args.folds, random_state=42)
+    else:
+        # Same split as main.py, expressed as one fold over train + val
+        train_data, val_data, _ = split_corpus(samples, config.data.get('dedup'), test_size=0.2, random_state=42)
+        samples = train_data + val_data
+        folds = [(list(range(len(train_data))), list(range(len(train_data), len(samples))))]
+
+    tokenizer = CachedTokenizer(AutoTokenizer.from_pretrained("vinai/phobert-base-v2"))
+    corpus = TokenizedCorpus([str(s.text) for s in samples], [int(s.label) for s in samples], tokenizer,
+                             max_lens=[t["max_len"] for t in trials])
+    print(f"--> Corpus: {len(corpus)} câu, tokenize 1 lần cho max_len {sorted(corpus.encodings)} "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    tasks = build_tasks(trials, n_folds=len(folds), epochs=args.epochs)
+    workers, threads = resolve_layout(len(tasks), args.workers, args.threads_per_worker)
+    early_stopping = dict(sweep_cfg.get('early_stopping') or {})
+    if args.no_early_stop:
+        early_stopping['enabled'] = False
+    print(f"--> {len(trials)} bộ tham số x {len(folds)} fold = {len(tasks)} lượt train | "
+          f"{workers} tiến trình x {threads} thread")
+
+    def on_result(result):
+        params = ", ".join(f"{k}={v}" for k, v in result["params"].items())
+        mark = "✂️ dừng sớm" if result["status"] == "pruned" else "✅"
+        print(f"{mark} trial {result['trial']} fold {result['fold']} ({params}): F1 {result['best_f1']:.4f} "
+              f"sau {result['epochs_run']} epoch, {result['seconds'] / 60:.1f} phút")
+
+    results, wall_seconds = run_sweep(tasks, corpus, folds, workers=workers, threads_per_worker=threads,
+                                      early_stopping=early_stopping, on_result=on_result)
+    rows = summarize_trials(results)
+
+    print(f"\n{'#':>3} | {'lr':>8} | {'max_len':>7} | {'dropout':>7} | {'batch':>5} | {'F1 TB':>7} | {'±':>6} | "
+          f"{'epoch':>5} | trạng thái")
+    print("-" * 84)
+    for row in rows:
+        print(f"{row['trial']:>3} | {row['lr']:>8.1e} | {row['max_len']:>7} | {row['dropout']:>7.2f} | "
+              f"{row['batch_size']:>5} | {row['mean_f1']:>7.4f} | {row['std_f1']:>6.4f} | {row['epochs_run']:>5} | "
+              f"{row['status']}")
+
+    # Summed trial time over elapsed time is how many trials were in flight on average. It is not a speedup:
+    # each trial ran on a slice of the cores, so it would have been faster alone with all of them
+    trial_seconds = sum(r["seconds"] for r in results)
+    epochs_saved = len(tasks) * args.epochs - sum(r["epochs_run"] for r in results)
+    print(f"\n--> Wall-clock {wall_seconds / 60:.1f} phút | tổng thời gian trial {trial_seconds / 60:.1f} phút "
+          f"| trung bình {trial_seconds / wall_seconds:.2f}/{workers} tiến trình bận | dừng sớm tiết kiệm "
+          f"{epochs_saved} epoch")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"folds": len(folds), "epochs": args.epochs, "workers": workers, "threads_per_worker": threads,
+                   "wall_seconds": wall_seconds, "trial_seconds": trial_seconds, "epochs_saved": epochs_saved,
+                   "early_stopping": early_stopping, "table": rows, "runs": results}, f, indent=2)
+    print(f"--> Kết quả: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
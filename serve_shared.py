@@ -0,0 +1,138 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+
+import torch
+import uvicorn
+
+from src.services.predictor import HateSpeechPredictor
+from src.models.artifact import is_artifact
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Phục vụ API nhiều worker dùng chung trọng số model (pre-fork, copy-on-write)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="Intra-op thread mỗi worker; mặc định chia đều số core cho các worker")
+    parser.add_argument("--pin", action="store_true",
+                        help="Ghim mỗi worker vào một dải CPU riêng (Linux)")
+    return parser.parse_args()
+
+
+def load_shared_predictor(model_path: str) -> HateSpeechPredictor:
+    """
+    Load once in the parent. Artifact weights are already a file mmap shared through the page cache;
+    .pth weights are moved into shared memory so every forked worker maps the same physical pages.
+    """
+    predictor = HateSpeechPredictor(model_path, device="cpu")
+    if not is_artifact(model_path):
+        predictor.model.share_memory()
+    # Workers only read weights; no autograd state should ever be attached to them
+    for param in predictor.model.parameters():
+        param.requires_grad_(False)
+    return predictor
+
+
+def cpu_slice(worker_index: int, threads: int):
+    cores = sorted(os.sched_getaffinity(0))
+    start = (worker_index * threads) % len(cores)
+    return set(cores[start:start + threads]) or set(cores)
+
+
+def run_worker(worker_index: int, args, sock: socket.socket, threads: int, predictor: HateSpeechPredictor):
+    # Per-worker budget so the sum of intra-op threads across workers matches the core count
+    torch.set_num_threads(threads)
+    if args.pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_slice(worker_index, threads))
+
+    # The app module was imported by the parent, but after fork its manager/lifespan state is per worker
+    from src.api.server import app, manager
+    manager.adopt(predictor)
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    server.run(sockets=[sock])
+
+
+def spawn_worker(worker_index, args, sock, threads, predictor) -> int:
+    pid = os.fork()
+    if pid == 0:
+        # Child: restore default signal handling, serve until told to stop, never return to the parent loop
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(worker_index, args, sock, threads, predictor)
+        except Exception as e:
+            print(f"❌ Worker {worker_index} lỗi: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    args = parse_args()
+    if not hasattr(os, "fork"):
+        print("❌ Chế độ dùng chung trọng số cần fork() (Linux/macOS)")
+        sys.exit(1)
+
+    # Admin hot-swaps must reach every worker, not just the one that received the request
+    if args.workers > 1:
+        os.environ["HSD_FLEET"] = "1"
+    from src.api.server import MODEL_PATH
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    threads = args.threads_per_worker or max(1, cores // args.workers)
+
+    # An initialized OpenMP pool does not survive fork() safely. The parent never runs a forward pass, but
+    # loading a .pth still random-initializes the architecture (from_config) before the weights overwrite
+    # it, and those init kernels would start the pool. With one intra-op thread they run inline and no pool
+    # exists at fork time; each worker sets its own thread count afterwards. Warmup happens in the workers.
+    torch.set_num_threads(1)
+    print(f"--> [SHARED] Load model 1 lần tại tiến trình cha: {MODEL_PATH}")
+    predictor = load_shared_predictor(str(MODEL_PATH))
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    print(f"--> [SHARED] {args.workers} worker x {threads} thread, lắng nghe {args.host}:{args.port}")
+    workers = {spawn_worker(i, args, sock, threads, predictor): i for i in range(args.workers)}
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # Supervise: a crashed worker is re-forked from the parent, which still holds the shared weights
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"--> [SHARED] Worker {index} (pid {pid}) thoát với mã {status}, khởi động lại")
+            workers[spawn_worker(index, args, sock, threads, predictor)] = index
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
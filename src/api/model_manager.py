@@ -0,0 +1,362 @@
+# src/api/model_manager.py
+import ctypes
+import gc
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import torch
+
+from src.services.predictor import HateSpeechPredictor
+from src.services.executor import InferenceExecutor
+
+STATUS_LOADING = "loading"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class CanaryCheckError(RuntimeError):
+    """Raised when a candidate checkpoint disagrees with the canary set; the live model stays in place."""
+
+
+def release_memory():
+    """
+    Return freed model memory to the OS right away instead of whenever the allocator decides:
+    collect reference cycles, drop cached CUDA blocks, and trim glibc's heap.
+    """
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def warmup(predictor: HateSpeechPredictor, batch_sizes: List[int], text_lengths: List[int], rounds: int = 2):
+    """
+    Push synthetic traffic through every (batch size, text length) shape so lazy allocations,
+    thread-pool start-up and kernel selection happen before real requests arrive.
+    """
+    for _ in range(rounds):
+        for n_words in text_lengths:
+            text = " ".join(["kiểm tra"] * max(1, n_words // 2))
+            for batch_size in batch_sizes:
+                predictor.predict_batch([text] * batch_size)
+
+
+class ModelManager:
+    def __init__(self, model_path: Path, device: str, warmup_config: Optional[dict] = None,
+                 executor: Optional[InferenceExecutor] = None, canary_config: Optional[dict] = None):
+        """
+        Owns the predictor lifecycle for the API: loads and warms it in a background thread so the
+        process answers liveness probes immediately and only reports ready once inference is fast.
+        """
+        self.model_path = Path(model_path)
+        self.device = device
+        self.warmup_config = warmup_config or {}
+        # When set, warmup runs on every executor lane: each lane thread owns its own OpenMP team
+        self.executor = executor
+
+        self.status = STATUS_LOADING
+        self.error = None
+        self.predictor: Optional[HateSpeechPredictor] = None
+        self.load_seconds = None
+        self._thread = None
+        self._preloaded: Optional[HateSpeechPredictor] = None
+
+        # Hot-swap state: one previous model is kept for instant rollback; swaps are serialized
+        self.canary_config = canary_config or {}
+        self.previous: Optional[HateSpeechPredictor] = None
+        self.previous_path: Optional[Path] = None
+        self.generation = 0
+        self._swap_lock = threading.Lock()
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+
+        # Fleet mode (several worker processes): admin swaps are published to a shared marker file that
+        # every worker follows; fleet_seq is the last marker revision this process has applied
+        self.fleet_marker: Optional[Path] = None
+        self.fleet_seq = 0
+        self.fleet_error = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == STATUS_READY
+
+    def adopt(self, predictor: HateSpeechPredictor):
+        """
+        Use a predictor built elsewhere (e.g. by a pre-fork parent holding shared weights);
+        the background task then only runs warmup in this process.
+        """
+        self._preloaded = predictor
+
+    def start_background_load(self):
+        self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.is_ready
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            if self._preloaded is not None:
+                predictor = self._preloaded
+            else:
+                if not self.model_path.exists():
+                    raise FileNotFoundError(f"Không tìm thấy model tại: {self.model_path}")
+
+                print(f"--> [SERVER] Đang load model từ: {self.model_path}")
+                predictor = HateSpeechPredictor(str(self.model_path), device=self.device)
+
+            # First load: warm every lane, since each lane thread owns its own OpenMP team
+            if self.executor is not None:
+                self.executor.broadcast(lambda: self._warmup(predictor))
+            else:
+                self._warmup(predictor)
+
+            self.predictor = predictor
+            self.load_seconds = time.perf_counter() - start
+            self.status = STATUS_READY
+            print(f"--> [SERVER] Model đã sẵn sàng! ({self.load_seconds:.1f}s, gồm warmup)")
+        except Exception as e:
+            self.error = str(e)
+            self.status = STATUS_FAILED
+            print(f"❌ Không load được model: {e}")
+
+    def _warmup(self, predictor: HateSpeechPredictor, rounds: int = None):
+        warmup(
+            predictor,
+            batch_sizes=self.warmup_config.get('batch_sizes', [1, 8, 32]),
+            text_lengths=self.warmup_config.get('text_lengths', [8, 48, 120]),
+            rounds=rounds or int(self.warmup_config.get('rounds', 2)),
+        )
+
+    def check_canary(self, predictor: HateSpeechPredictor) -> float:
+        """Accuracy of predictor on the configured canary samples; raises CanaryCheckError below threshold."""
+        samples = self.canary_config.get('samples') or []
+        if not samples:
+            return 1.0
+        results = predictor.predict_batch([s['text'] for s in samples])
+        correct = sum(r['label'] == s['label'] for r, s in zip(results, samples))
+        accuracy = correct / len(samples)
+        min_accuracy = float(self.canary_config.get('min_accuracy', 1.0))
+        if accuracy < min_accuracy:
+            raise CanaryCheckError(f"Canary accuracy {accuracy:.2%} < {min_accuracy:.2%}")
+        return accuracy
+
+    def swap_to(self, model_path: Path) -> dict:
+        """
+        Load a checkpoint next to the live model, warm it, gate it on the canary set, then swap the
+        reference atomically. Requests already submitted hold a bound method of the old predictor and
+        finish on it; the model before the old one is released so at most two stay resident.
+        """
+        model_path = Path(model_path)
+        with self._swap_lock:
+            start = time.perf_counter()
+            if not model_path.exists():
+                raise FileNotFoundError(f"Không tìm thấy model tại: {model_path}")
+
+            print(f"--> [SERVER] Hot-swap: đang load {model_path}")
+            candidate = HateSpeechPredictor(str(model_path), device=self.device)
+            try:
+                if self.executor is not None:
+                    # On the lanes, with their thread budgets: a forward pass on this thread would use
+                    # torch's default thread count and oversubscribe the cores the lanes are using.
+                    # Every lane touches the new weights once (one round: the lane thread teams are
+                    # already hot); live requests queue behind it for that long
+                    self.executor.broadcast(lambda: self._warmup(candidate, rounds=1))
+                    accuracy = self.executor.run(self.check_canary, candidate)
+                else:
+                    self._warmup(candidate)
+                    accuracy = self.check_canary(candidate)
+            except Exception:
+                del candidate
+                release_memory()
+                raise
+
+            # Single attribute assignments: readers see either the old or the new predictor, never a mix
+            retired = self.previous
+            self.previous, self.previous_path = self.predictor, self.model_path
+            self.predictor, self.model_path = candidate, model_path
+            self.generation += 1
+
+            del retired
+            release_memory()
+
+            elapsed = time.perf_counter() - start
+            print(f"--> [SERVER] Hot-swap xong: generation {self.generation} ({elapsed:.1f}s)")
+            return {"generation": self.generation, "model_path": str(model_path),
+                    "canary_accuracy": accuracy, "seconds": elapsed}
+
+    def rollback(self) -> dict:
+        """Swap back to the previous model; the current one becomes the new rollback target."""
+        with self._swap_lock:
+            if self.previous is None:
+                raise RuntimeError("Không có model trước đó để rollback")
+            self.predictor, self.previous = self.previous, self.predictor
+            self.model_path, self.previous_path = self.previous_path, self.model_path
+            self.generation += 1
+            print(f"--> [SERVER] Rollback về {self.model_path} (generation {self.generation})")
+            return {"generation": self.generation, "model_path": str(self.model_path)}
+
+    def info(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "status": self.status,
+            "generation": self.generation,
+            "model_path": str(self.model_path),
+            "previous_path": str(self.previous_path) if self.previous_path else None,
+            "fleet_seq": self.fleet_seq if self.fleet_marker is not None else None,
+            "fleet_error": self.fleet_error,
+        }
+
+    # --- Fleet mode ---
+
+    def _status_dir(self) -> Path:
+        return self.fleet_marker.with_name(self.fleet_marker.name + ".workers")
+
+    @staticmethod
+    def _read_json(path: Path) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path: Path, payload: dict):
+        # Atomic: followers polling the file never read a half-written marker
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+    def _report_fleet_status(self):
+        self._status_dir().mkdir(parents=True, exist_ok=True)
+        self._write_json(self._status_dir() / f"{os.getpid()}.json", {**self.info(), "updated_at": time.time()})
+
+    def publish(self) -> int:
+        """
+        Record this process's current model as the fleet target; called after a local admin swap succeeded.
+        Returns the new marker revision, which the other workers apply on their next poll.
+        """
+        lock_path = self.fleet_marker.with_name(self.fleet_marker.name + ".lock")
+        with open(lock_path, "a") as lock:
+            try:
+                import fcntl
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            current = self._read_json(self.fleet_marker) or {}
+            seq = int(current.get("seq", 0)) + 1
+            self._write_json(self.fleet_marker, {"seq": seq, "model_path": str(self.model_path),
+                                                 "by_pid": os.getpid(), "updated_at": time.time()})
+        self.fleet_seq = seq
+        self.fleet_error = None
+        self._report_fleet_status()
+        return seq
+
+    def _follow(self, target: Path):
+        """Converge on the fleet target: nothing, an instant rollback, or a full (warmed, canaried) swap."""
+        if target == self.model_path:
+            return
+        if self.previous is not None and target == self.previous_path:
+            self.rollback()
+        else:
+            self.swap_to(target)
+
+    def fleet_target(self) -> Optional[dict]:
+        return self._read_json(self.fleet_marker) if self.fleet_marker is not None else None
+
+    def fleet_workers(self) -> List[dict]:
+        """Last reported state of every live worker; files of exited workers are dropped."""
+        workers = []
+        for path in sorted(self._status_dir().glob("*.json")):
+            status = self._read_json(path)
+            if status is None:
+                continue
+            try:
+                os.kill(int(status["pid"]), 0)
+            except (OSError, KeyError, ValueError):
+                path.unlink(missing_ok=True)
+                continue
+            workers.append(status)
+        return workers
+
+    def start_fleet(self, marker_path: Path, poll_seconds: float = 2.0):
+        """Follow the shared marker: every worker ends up on the model the last admin swap published."""
+        self.fleet_marker = Path(marker_path)
+        self.fleet_marker.parent.mkdir(parents=True, exist_ok=True)
+
+        def loop():
+            reported = False
+            while not self._watch_stop.wait(poll_seconds):
+                if not self.is_ready:
+                    continue
+                if not reported:
+                    self._report_fleet_status()
+                    reported = True
+                marker = self._read_json(self.fleet_marker)
+                if marker is None or int(marker.get("seq", 0)) <= self.fleet_seq:
+                    continue
+                seq = int(marker["seq"])
+                try:
+                    self._follow(Path(marker["model_path"]))
+                    self.fleet_error = None
+                except Exception as e:
+                    # Not retried for this revision; visible in /admin/fleet until the next publish
+                    self.fleet_error = str(e)
+                    print(f"❌ Worker {os.getpid()} không theo được model của fleet (seq {seq}): {e}")
+                self.fleet_seq = seq
+                self._report_fleet_status()
+
+        threading.Thread(target=loop, name="fleet-follow", daemon=True).start()
+
+    @staticmethod
+    def _fingerprint(path: Path):
+        """(mtime, size) of a checkpoint file, or of the weights inside an artifact directory."""
+        target = path
+        if path.is_dir():
+            target = path / "model.safetensors"
+        try:
+            stat = os.stat(target)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def start_watch(self, watch_path: Path, poll_seconds: float = 10.0):
+        """Poll watch_path and hot-swap when it changes; a change must be stable for one poll (no half-written files)."""
+        watch_path = Path(watch_path)
+
+        def loop():
+            seen = self._fingerprint(watch_path)
+            pending = None
+            while not self._watch_stop.wait(poll_seconds):
+                # Initial load owns the model slot until it finishes
+                if not self.is_ready:
+                    continue
+                current = self._fingerprint(watch_path)
+                if current is None or current == seen:
+                    pending = None
+                    continue
+                if current != pending:
+                    pending = current
+                    continue
+                seen, pending = current, None
+                try:
+                    self.swap_to(watch_path)
+                except Exception as e:
+                    print(f"❌ Hot-swap thất bại, giữ model hiện tại: {e}")
+
+        self._watch_thread = threading.Thread(target=loop, name="checkpoint-watch", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watch(self):
+        self._watch_stop.set()
@@ -1,49 +1,184 @@
 # src/api/server.py
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from pathlib import Path
+from typing import Optional
+import os
 import torch
 import uvicorn
 
-from src.services.predictor import HateSpeechPredictor
+from src.api.model_manager import CanaryCheckError, ModelManager
+from src.api.streaming import DuplexStreamingResponse, stream_predictions
+from src.services.evaluation import read_best_checkpoint
+from src.services.executor import ExecutorSaturatedError, InferenceExecutor
+from src.utils.config_loader import config
 
-# Resolve model checkpoints relative to repo root; fail fast if missing to avoid serving partial functionality
+# Resolve model checkpoints relative to repo root. Precedence: HSD_MODEL_PATH, then the checkpoint
+# marked best by evaluate_checkpoints.py, then the configured path
 BASE_DIR = Path(__file__).resolve().parents[2]
-MODEL_PATH = BASE_DIR / "models" / "phobert_epoch_3.pth"
-
-print(f"--> [DEBUG] Đang tìm model tại: {MODEL_PATH}")
-
-if not MODEL_PATH.exists():
-    raise RuntimeError(f"❌ Không tìm thấy model tại: {MODEL_PATH}")
+serving_cfg = config.serving if config is not None else {}
+MODEL_PATH = BASE_DIR / (os.environ.get("HSD_MODEL_PATH") or read_best_checkpoint(str(BASE_DIR))
+                         or serving_cfg.get("model_path", "models/phobert_epoch_3.pth"))
 
 # Choose device at startup; inference latency depends on this selection, but correctness should not
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
-try:
-    # Predictor encapsulates preprocessing + model; constructed once to avoid per-request overhead
-    predictor = HateSpeechPredictor(str(MODEL_PATH), device=device)
-    print("--> [SERVER] Model đã sẵn sàng!")
-except Exception as e:
-    raise RuntimeError(f"❌ Không load được model: {e}")
+# Model is loaded by the lifespan hook, never at import: importing the app stays cheap for CLIs/workers
+manager = ModelManager(MODEL_PATH, device=device, warmup_config=serving_cfg.get("warmup"),
+                       canary_config=serving_cfg.get("canary"))
+
+hot_swap_cfg = serving_cfg.get("hot_swap") or {}
+ADMIN_TOKEN = os.environ.get("HSD_ADMIN_TOKEN", hot_swap_cfg.get("admin_token"))
+# Admin swaps may only load files from here: torch.load of an arbitrary path can execute pickled code
+MODELS_DIR = (BASE_DIR / "models").resolve()
+# Without a token, admin routes answer only to clients on this machine
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+# Several worker processes (serve_shared.py sets HSD_FLEET; set hot_swap.fleet for uvicorn --workers):
+# an admin swap lands on one worker, which publishes it through the marker file the others follow
+FLEET = os.environ.get("HSD_FLEET") == "1" or bool(hot_swap_cfg.get("fleet", False))
+FLEET_MARKER = BASE_DIR / hot_swap_cfg.get("fleet_marker", "models/active_model.json")
+
+# Seconds clients should wait before retrying while the model is still loading
+RETRY_AFTER_SECONDS = 5
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Lanes are threads, so they are created here (per worker process, after any fork), not at import
+    executor_cfg = serving_cfg.get("executor") or {}
+    manager.executor = InferenceExecutor(
+        lanes=executor_cfg.get("lanes"),
+        threads_per_lane=executor_cfg.get("threads_per_lane"),
+        interop_threads=int(executor_cfg.get("interop_threads", 1)),
+        cpu_sets=executor_cfg.get("cpu_sets"),
+        pin=bool(executor_cfg.get("pin", False)),
+        queue_size=int(executor_cfg.get("queue_size", 64)),
+    )
+    # Load in the background so the server accepts connections (and liveness probes) immediately
+    manager.start_background_load()
+    if FLEET:
+        manager.start_fleet(FLEET_MARKER, poll_seconds=float(hot_swap_cfg.get("fleet_poll_seconds", 2)))
+    if hot_swap_cfg.get("watch"):
+        watch_path = BASE_DIR / hot_swap_cfg["watch_path"] if hot_swap_cfg.get("watch_path") else MODEL_PATH
+        manager.start_watch(watch_path, poll_seconds=float(hot_swap_cfg.get("poll_seconds", 10)))
+    yield
+    manager.stop_watch()
+    manager.executor.shutdown()
 
-# API surface kept minimal: health and single prediction endpoint for synchronous use cases
-app = FastAPI(title="Hate Speech Detection API")
+
+# API surface kept minimal: probes and single prediction endpoint for synchronous use cases
+app = FastAPI(title="Hate Speech Detection API", lifespan=lifespan)
 
 class PredictRequest(BaseModel):
     text: str
 
+class ReloadRequest(BaseModel):
+    # Relative to the repo root and confined to models/; omitted means re-read the current path
+    model_path: Optional[str] = None
+
 class PredictResponse(BaseModel):
     label: str
     confidence: str
     clean_text: str
+    # Encoder layers run for this text; only set when serving an early-exit checkpoint
+    exit_layer: Optional[int] = None
 
-# Health endpoint used by dashboards/probes; indicates device and readiness without triggering inference
+# Health endpoint used by dashboards; reports load status and device without triggering inference
 @app.get("/")
 def health_check():
-    return {"status": "healthy", "device": device}
+    return {"status": "healthy" if manager.is_ready else manager.status, "device": device}
+
+# Liveness: the process is up and serving HTTP, regardless of model state
+@app.get("/livez")
+def livez():
+    return {"status": "alive"}
+
+# Readiness: only true once the model is loaded and warmed up; load failures stay not-ready
+@app.get("/readyz")
+def readyz():
+    if manager.is_ready:
+        return {"status": "ready", "device": device, "load_seconds": manager.load_seconds}
+    return JSONResponse(
+        status_code=503,
+        content={"status": manager.status, "error": manager.error},
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+# Per-lane queueing and execution times, for tuning lanes/threads against observed tail latency
+@app.get("/executor/stats")
+def executor_stats():
+    return manager.executor.stats() if manager.executor is not None else {}
+
+def require_admin(request: Request, token: Optional[str]):
+    if ADMIN_TOKEN:
+        if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+            raise HTTPException(status_code=403, detail="Sai hoặc thiếu X-Admin-Token")
+        return
+    client = request.client.host if request.client else None
+    if client not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="Chưa cấu hình admin token: chỉ gọi được từ localhost")
+
+def resolve_model_path(raw: str) -> Path:
+    # Relative to the repo root, like model_path in config; must stay inside models/ after resolving
+    path = (BASE_DIR / raw).resolve()
+    if not path.is_relative_to(MODELS_DIR):
+        raise HTTPException(status_code=400, detail=f"model_path phải nằm trong {MODELS_DIR.name}/")
+    return path
+
+@app.get("/admin/model")
+def admin_model(request: Request, x_admin_token: str = Header(None)):
+    require_admin(request, x_admin_token)
+    return manager.info()
+
+# Every worker's model and applied marker revision; only meaningful in fleet mode
+@app.get("/admin/fleet")
+def admin_fleet(request: Request, x_admin_token: str = Header(None)):
+    require_admin(request, x_admin_token)
+    if not FLEET:
+        return {"fleet": False, "workers": [manager.info()]}
+    return {"fleet": True, "marker": manager.fleet_target(), "workers": manager.fleet_workers()}
+
+def fleet_result(result: dict) -> dict:
+    # The swap ran in this worker; in fleet mode the other workers follow within fleet_poll_seconds
+    result["pid"] = os.getpid()
+    result["fleet"] = FLEET
+    if FLEET:
+        result["fleet_seq"] = manager.publish()
+    return result
+
+# Load next to the live model, warm up, canary-check, then swap; traffic keeps flowing throughout
+@app.post("/admin/reload")
+def admin_reload(req: ReloadRequest, request: Request, x_admin_token: str = Header(None)):
+    require_admin(request, x_admin_token)
+    path = resolve_model_path(req.model_path) if req.model_path else manager.model_path
+    if not manager.is_ready:
+        raise HTTPException(status_code=409, detail="Model ban đầu chưa sẵn sàng")
+    try:
+        return fleet_result(manager.swap_to(path))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except CanaryCheckError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/admin/rollback")
+def admin_rollback(request: Request, x_admin_token: str = Header(None)):
+    require_admin(request, x_admin_token)
+    try:
+        return fleet_result(manager.rollback())
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 @app.post("/predict", response_model=PredictResponse)
-def predict(req: PredictRequest):
+async def predict(req: PredictRequest):
+    # Reject quickly while loading instead of queueing requests behind a multi-second model load
+    if not manager.is_ready:
+        raise HTTPException(status_code=503, detail="Model đang được tải, vui lòng thử lại sau.",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
     # Basic input validation to avoid degenerate requests and excessive payloads
     if not req.text.strip():
         raise HTTPException(status_code=400, detail="Vui lòng nhập nội dung, không được để trống.")
@@ -51,16 +186,42 @@ def predict(req: PredictRequest):
     if len(req.text) > 2000:
         raise HTTPException(status_code=400, detail="Nội dung quá dài (tối đa 2000 ký tự).")
 
+    # Runs on a dedicated inference lane, not FastAPI's threadpool, so concurrent forwards never oversubscribe
     try:
-        result = predictor.predict(req.text)
+        future = manager.executor.submit(manager.predictor.predict, req.text)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=f"Máy chủ quá tải: {e}",
+                            headers={"Retry-After": "1"})
+
+    try:
+        result = await asyncio.wrap_future(future)
         return PredictResponse(
             label=result['label'],
             confidence=result['confidence'],
-            clean_text=result['text_clean']
+            clean_text=result['text_clean'],
+            exit_layer=result.get('exit_layer')
         )
     except Exception as e:
         # Surface internal errors as 500; detailed logging should be added in production
         raise HTTPException(status_code=500, detail=str(e))
 
+# Full-duplex NDJSON: one {"text": ..., "id": ...} per line in, one verdict per line out, in input order
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    if not manager.is_ready:
+        raise HTTPException(status_code=503, detail="Model đang được tải, vui lòng thử lại sau.",
+                            headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    stream_cfg = serving_cfg.get("stream") or {}
+    return DuplexStreamingResponse(
+        stream_predictions(
+            request, manager,
+            batch_size=int(stream_cfg.get("batch_size", 32)),
+            linger_ms=float(stream_cfg.get("linger_ms", 20)),
+            max_inflight_batches=int(stream_cfg.get("max_inflight_batches", 4)),
+            max_line_bytes=int(stream_cfg.get("max_line_bytes", 8192)),
+        ),
+        media_type="application/x-ndjson",
+    )
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,191 @@
+# src/api/streaming.py
+import asyncio
+import json
+from typing import AsyncIterator, List, Optional
+
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import StreamingResponse
+
+from src.api.model_manager import ModelManager
+from src.services.executor import ExecutorSaturatedError
+
+# Max characters per text, same limit as /predict
+MAX_TEXT_CHARS = 2000
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that leaves receive() to the request-body reader. The stock class listens for
+    disconnects on receive() while streaming, which would swallow body chunks of a full-duplex stream;
+    here a disconnect surfaces through request.stream() (ClientDisconnect) instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+class _Entry:
+    __slots__ = ("line_no", "id", "text", "error")
+
+    def __init__(self, line_no: int, id=None, text: Optional[str] = None, error: Optional[str] = None):
+        self.line_no = line_no
+        self.id = id
+        self.text = text
+        self.error = error
+
+
+def _parse_line(line_no: int, raw: bytes) -> _Entry:
+    try:
+        obj = json.loads(raw)
+    except ValueError:
+        obj = None
+    # Valid JSON that is not an object ("abc", [1, 2], 42, null) is as malformed as broken JSON
+    if not isinstance(obj, dict):
+        return _Entry(line_no, error="Dòng không phải JSON hợp lệ dạng {\"text\": ...}")
+    text = obj.get("text")
+    entry_id = obj.get("id")
+    if not isinstance(text, str) or not text.strip():
+        return _Entry(line_no, id=entry_id, error="Thiếu nội dung 'text'")
+    if len(text) > MAX_TEXT_CHARS:
+        return _Entry(line_no, id=entry_id, error=f"Nội dung quá dài (tối đa {MAX_TEXT_CHARS} ký tự)")
+    return _Entry(line_no, id=entry_id, text=text)
+
+
+def _format(entry: _Entry, result: Optional[dict] = None, error: Optional[str] = None) -> bytes:
+    out = {"line": entry.line_no}
+    if entry.id is not None:
+        out["id"] = entry.id
+    error = entry.error or error
+    if error is not None:
+        out["error"] = error
+    else:
+        out.update(label=result["label"], confidence=result["confidence"], clean_text=result["text_clean"])
+        if "exit_layer" in result:
+            out["exit_layer"] = result["exit_layer"]
+    return (json.dumps(out, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def stream_predictions(request: Request, manager: ModelManager, batch_size: int = 32,
+                             linger_ms: float = 20, max_inflight_batches: int = 4,
+                             max_line_bytes: int = 8192, chunk_queue_size: int = 8) -> AsyncIterator[bytes]:
+    """
+    Read NDJSON lines from the request body, score them in model batches on the inference executor,
+    and yield NDJSON verdicts in input order as soon as each batch completes.
+
+    Memory is bounded end to end: the body reader stops pulling from the socket when chunk_queue_size
+    chunks are waiting (TCP flow control then slows the producer), and the batcher stops reading chunks
+    while max_inflight_batches batches are scored or waiting to be written.
+    """
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=chunk_queue_size)
+    inflight: asyncio.Queue = asyncio.Queue(maxsize=max_inflight_batches)
+    linger = linger_ms / 1000
+    too_long = f"Dòng vượt quá {max_line_bytes} byte"
+
+    def entry_for(line_no: int, raw: bytes) -> _Entry:
+        # Same limit whether the line arrived whole in one chunk or was cut off while buffering
+        if len(raw) > max_line_bytes:
+            return _Entry(line_no, error=too_long)
+        return _parse_line(line_no, raw)
+
+    async def pump():
+        try:
+            async for chunk in request.stream():
+                if chunk:
+                    await chunks.put(chunk)
+        except ClientDisconnect:
+            pass
+        finally:
+            await chunks.put(None)
+
+    async def submit(entries: List[_Entry]):
+        texts = [e.text for e in entries if e.error is None]
+        future = None
+        if texts:
+            # Predictor is captured per batch: a hot-swap mid-stream applies from the next batch on
+            predictor = manager.predictor
+            while future is None:
+                try:
+                    future = asyncio.wrap_future(manager.executor.submit(predictor.predict_batch, texts))
+                except ExecutorSaturatedError:
+                    # Long-lived stream: wait for a lane rather than failing; this also throttles reading
+                    await asyncio.sleep(linger or 0.005)
+        await inflight.put((entries, future))
+
+    async def batcher():
+        buffer = b""
+        line_no = 0
+        skipping = False
+        pending: List[_Entry] = []
+        try:
+            while True:
+                try:
+                    # Only linger when a partial batch is waiting; otherwise block until data arrives
+                    chunk = await (asyncio.wait_for(chunks.get(), linger) if pending else chunks.get())
+                except asyncio.TimeoutError:
+                    await submit(pending)
+                    pending = []
+                    continue
+
+                if chunk is None:
+                    break
+                if skipping:
+                    # Still inside an oversized line: drop bytes until its newline
+                    if b"\n" not in chunk:
+                        continue
+                    chunk = chunk.split(b"\n", 1)[1]
+                    skipping = False
+
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for raw in lines:
+                    if not raw.strip():
+                        continue
+                    line_no += 1
+                    pending.append(entry_for(line_no, raw))
+                    if len(pending) >= batch_size:
+                        await submit(pending)
+                        pending = []
+
+                # An unterminated line past the limit is reported and discarded, never buffered further
+                if len(buffer) > max_line_bytes:
+                    line_no += 1
+                    pending.append(_Entry(line_no, error=too_long))
+                    buffer = b""
+                    skipping = True
+
+            if buffer.strip() and not skipping:
+                line_no += 1
+                pending.append(entry_for(line_no, buffer))
+            if pending:
+                await submit(pending)
+        finally:
+            await inflight.put(None)
+
+    pump_task = asyncio.create_task(pump())
+    batch_task = asyncio.create_task(batcher())
+    try:
+        while True:
+            item = await inflight.get()
+            if item is None:
+                break
+            entries, future = item
+            results, batch_error = [], None
+            if future is not None:
+                try:
+                    results = await future
+                except Exception as e:
+                    batch_error = str(e)
+
+            out = []
+            valid = iter(results)
+            for entry in entries:
+                if entry.error is not None or batch_error is not None:
+                    out.append(_format(entry, error=batch_error))
+                else:
+                    out.append(_format(entry, result=next(valid)))
+            yield b"".join(out)
+        # Surface unexpected batcher failures instead of silently truncating the stream
+        await batch_task
+    finally:
+        for task in (pump_task, batch_task):
+            task.cancel()
@@ -1,20 +1,25 @@
+import time
+
 import torch
-from torch.utils.data import Dataset
-from typing import List
+from torch.utils.data import BatchSampler, DataLoader, Dataset, Sampler
+from typing import List, Sequence, Union
 from src.core.dtos import HateSpeechSample
+from src.services.tokenization import CachedTokenizer
 from transformers import PreTrainedTokenizer
 
 
 class HateSpeechDataset(Dataset):
     def __init__(self, data: List[HateSpeechSample],
-                 tokenizer: PreTrainedTokenizer,
+                 tokenizer: Union[PreTrainedTokenizer, CachedTokenizer],
                  max_len: int = 128):
         """
         Dataset for sentence-level classification; expects preprocessed text and integer labels.
-        Tokenization is performed lazily per item to balance memory and simplicity; adjust if throughput demands.
+        Tokenization is performed lazily through the memoized word cache; pass a shared CachedTokenizer
+        so train and val splits reuse the same cache. Indexing with a list of indices returns a whole
+        batch from one encode_batch call (see build_data_loader), which is also safe in loader workers.
         """
         self.data = data
-        self.tokenizer = tokenizer
+        self.tokenizer = tokenizer if isinstance(tokenizer, CachedTokenizer) else CachedTokenizer(tokenizer)
         self.max_len = max_len
         # Labels are expected as 0/1 strings or ints; downstream loss requires contiguous integer classes
         pass
@@ -23,24 +28,78 @@ class HateSpeechDataset(Dataset):
         return len(self.data)
 
     def __getitem__(self, index):
+        if isinstance(index, (list, tuple)):
+            return self._get_batch(index)
+
         sample = self.data[index]
         text = str(sample.text)
 
         # Default to label 0 when absent to support inference-only datasets
         label = int(sample.label) if sample.label is not None else 0
 
-        encoding = self.tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=self.max_len,
-            padding='max_length',
-            truncation=True,
-            return_attention_mask=True,
-            return_tensors='pt',
-        )
+        encoding = self.tokenizer.encode_batch([text], self.max_len)
 
         return {
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten(),
+            'input_ids': encoding['input_ids'][0],
+            'attention_mask': encoding['attention_mask'][0],
             'labels': torch.tensor(label, dtype=torch.long)
-        }
\ No newline at end of file
+        }
+
+    def _get_batch(self, indices: Sequence[int]):
+        samples = [self.data[i] for i in indices]
+        start = time.perf_counter()
+        encoding = self.tokenizer.encode_batch([str(s.text) for s in samples], self.max_len)
+        labels = [int(s.label) if s.label is not None else 0 for s in samples]
+        return {
+            'input_ids': encoding['input_ids'],
+            'attention_mask': encoding['attention_mask'],
+            'labels': torch.tensor(labels, dtype=torch.long),
+            # Travels with the batch so telemetry sees encode time even when a loader worker built it
+            'tokenize_seconds': time.perf_counter() - start
+        }
+
+
+class PretokenizedDataset(Dataset):
+    def __init__(self, input_ids: torch.Tensor, attention_mask: torch.Tensor, labels: torch.Tensor,
+                 indices: Sequence[int]):
+        """
+        Rows `indices` of an already tokenized corpus (e.g. one fold of a sweep). The tensors are indexed,
+        never copied up front, so worker processes can all read one shared-memory corpus.
+        Supports the same list-of-indices batch fetching as HateSpeechDataset.
+        """
+        self.input_ids = input_ids
+        self.attention_mask = attention_mask
+        self.labels = labels
+        self.indices = torch.as_tensor(indices, dtype=torch.long)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        rows = self.indices[list(index)] if isinstance(index, (list, tuple)) else self.indices[index]
+        return {
+            'input_ids': self.input_ids[rows],
+            'attention_mask': self.attention_mask[rows],
+            'labels': self.labels[rows]
+        }
+
+
+def build_data_loader(dataset: HateSpeechDataset, sampler: Sampler, batch_size: int, num_workers: int = 0,
+                      prefetch_factor: int = 2, persistent_workers: bool = False,
+                      pin_memory: bool = False) -> DataLoader:
+    """
+    DataLoader that fetches whole batches: the BatchSampler's index lists go straight to
+    HateSpeechDataset.__getitem__, so each batch is one vectorized tokenization and needs no collation.
+    With num_workers > 0, batches are built in worker processes, prefetch_factor batches ahead each.
+    persistent_workers keeps workers (and their warm tokenizer caches) alive across epochs.
+    """
+    workers = max(0, int(num_workers))
+    return DataLoader(
+        dataset,
+        batch_size=None,
+        sampler=BatchSampler(sampler, batch_size=batch_size, drop_last=False),
+        num_workers=workers,
+        prefetch_factor=prefetch_factor if workers > 0 else None,
+        persistent_workers=persistent_workers and workers > 0,
+        pin_memory=pin_memory,
+    )
@@ -0,0 +1,235 @@
+# src/data_layer/dedup.py
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sklearn.model_selection import StratifiedGroupKFold, StratifiedKFold, train_test_split
+
+from src.core.dtos import HateSpeechSample
+
+# Mersenne prime for the universal hash family h(x) = (a*x + b) mod p, as in standard MinHash
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+CONFLICT_POLICIES = ("majority", "toxic", "drop")
+
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows == num_perm whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Smallest index as root, so a group is represented by its first occurrence
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+class NearDuplicateDetector:
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 42):
+        """
+        MinHash over character shingles of whitespace-normalized text, with LSH banding: texts whose
+        estimated Jaccard similarity reaches `threshold` end up in one group. Each text is hashed once and
+        only bucket-mates are compared, so the cost grows roughly linearly with corpus size.
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        text = re.sub(r"\s+", " ", text.strip().lower())
+        k = self.shingle_size
+        grams = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+        # crc32 is stable across processes, unlike the salted built-in hash()
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        sigs = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for i, text in enumerate(texts):
+            x = self._shingles(text)
+            # uint64 products wrap around, which keeps this a usable (if not exact) universal hash family
+            hashed = ((np.outer(x, self._a) + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+            sigs[i] = hashed.min(axis=0)
+        return sigs
+
+    def find_groups(self, texts: List[str]) -> List[int]:
+        """Group id per text; the id is the index of the group's first text."""
+        sigs = self.signatures(texts)
+        uf = _UnionFind(len(texts))
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            band_sigs = sigs[:, band * self.rows:(band + 1) * self.rows]
+            for i in range(len(texts)):
+                buckets[band_sigs[i].tobytes()].append(i)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                # Verify against the bucket's first member: banding alone admits false positives
+                head = members[0]
+                agreement = (sigs[members[1:]] == sigs[head]).mean(axis=1)
+                for j, score in zip(members[1:], agreement):
+                    if score >= self.threshold:
+                        uf.union(head, j)
+        return [uf.find(i) for i in range(len(texts))]
+
+
+def _resolve_label(labels: List[str], policy: str) -> Optional[str]:
+    counts = Counter(labels)
+    if len(counts) == 1:
+        return labels[0]
+    if policy == "drop":
+        return None
+    if policy == "toxic":
+        return max(counts, key=int)
+    # Majority; ties go to the more severe label, the cheaper mistake for moderation
+    return max(counts, key=lambda label: (counts[label], int(label)))
+
+
+def deduplicate(samples: List[HateSpeechSample], detector: NearDuplicateDetector,
+                conflict: str = "majority") -> Tuple[List[HateSpeechSample], List[int], dict]:
+    """
+    Collapse each near-duplicate group to its first sample. When a group has conflicting labels they are
+    resolved by `conflict`: "majority", "toxic" (any toxic member wins) or "drop" (remove the group).
+    Returns (kept samples, group id per input sample, report).
+    """
+    if conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"conflict phải là một trong {CONFLICT_POLICIES}, nhận được '{conflict}'")
+
+    groups = detector.find_groups([str(s.text) for s in samples])
+    members = defaultdict(list)
+    for i, group in enumerate(groups):
+        members[group].append(i)
+
+    kept, conflicts, dropped = [], 0, 0
+    for group in sorted(members):
+        indices = members[group]
+        labels = [str(samples[i].label) for i in indices]
+        label = _resolve_label(labels, conflict)
+        if len(set(labels)) > 1:
+            conflicts += 1
+        if label is None:
+            dropped += len(indices)
+            continue
+        kept.append(HateSpeechSample(text=samples[indices[0]].text, label=label))
+
+    report = {
+        "rows_in": len(samples),
+        "rows_out": len(kept),
+        "rows_removed": len(samples) - len(kept),
+        "duplicate_groups": sum(1 for indices in members.values() if len(indices) > 1),
+        "label_conflicts": conflicts,
+        "rows_dropped_for_conflict": dropped,
+        "threshold": detector.threshold,
+        "bands": detector.bands,
+        "rows_per_band": detector.rows,
+    }
+    return kept, groups, report
+
+
+def group_train_test_split(samples: List[HateSpeechSample], groups: List[int], test_size: float = 0.2,
+                           random_state: int = 42):
+    """Stratified split in which every near-duplicate group lands entirely in train or entirely in val."""
+    n_splits = max(2, round(1 / test_size))
+    labels = [int(s.label) for s in samples]
+    splitter = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    train_idx, val_idx = next(splitter.split(np.zeros(len(samples)), labels, groups))
+    return [samples[i] for i in train_idx], [samples[i] for i in val_idx]
+
+
+def _as_group_split_report(report: dict, rows: int):
+    # Every row is kept with its own label; only where duplicates land changes. The conflict policy is
+    # not applied, so label_conflicts counts mixed-label groups and nothing is reported as dropped
+    report.update(rows_out=rows, rows_removed=0, conflict_policy_applied=False)
+    report.pop("rows_dropped_for_conflict", None)
+
+
+def _detector_from_cfg(dedup_cfg: dict, random_state: int) -> NearDuplicateDetector:
+    return NearDuplicateDetector(
+        threshold=float(dedup_cfg.get("threshold", 0.8)),
+        num_perm=int(dedup_cfg.get("num_perm", 128)),
+        shingle_size=int(dedup_cfg.get("shingle_size", 5)),
+        seed=random_state,
+    )
+
+
+def split_corpus(samples: List[HateSpeechSample], dedup_cfg: Optional[dict] = None, test_size: float = 0.2,
+                 random_state: int = 42):
+    """
+    Train/val split used by the training entry points. dedup_cfg (config `data.dedup`) selects:
+    mode "collapse" (drop near-duplicates, then split) or "group_split" (keep every row, split by group).
+    Returns (train, val, report); report is None when dedup is disabled.
+    """
+    dedup_cfg = dedup_cfg or {}
+    if not dedup_cfg.get("enabled", False):
+        labels = [int(s.label) for s in samples]
+        train, val = train_test_split(samples, test_size=test_size, random_state=random_state, stratify=labels)
+        return train, val, None
+
+    mode = dedup_cfg.get("mode", "collapse")
+    kept, groups, report = deduplicate(samples, _detector_from_cfg(dedup_cfg, random_state),
+                                       conflict=dedup_cfg.get("conflict", "majority"))
+
+    if mode == "group_split":
+        train, val = group_train_test_split(samples, groups, test_size=test_size, random_state=random_state)
+        _as_group_split_report(report, len(samples))
+    elif mode == "collapse":
+        labels = [int(s.label) for s in kept]
+        train, val = train_test_split(kept, test_size=test_size, random_state=random_state, stratify=labels)
+    else:
+        raise ValueError(f"dedup.mode phải là 'collapse' hoặc 'group_split', nhận được '{mode}'")
+
+    # What the same split would have trained on without dedup, to report the per-epoch saving exactly
+    baseline_train = len(samples) - int(np.ceil(test_size * len(samples)))
+    report.update(mode=mode, train_rows=len(train), val_rows=len(val),
+                  train_rows_saved_per_epoch=baseline_train - len(train))
+    return train, val, report
+
+
+def kfold_corpus(samples: List[HateSpeechSample], dedup_cfg: Optional[dict] = None, n_splits: int = 5,
+                 random_state: int = 42):
+    """
+    Stratified k-fold counterpart of split_corpus, with the same dedup semantics: "collapse" folds the
+    deduplicated rows, "group_split" keeps every row and never splits a near-duplicate group across folds.
+    Returns (samples, [(train_idx, val_idx), ...], report); indices refer to the returned samples.
+    """
+    dedup_cfg = dedup_cfg or {}
+    report = None
+    groups = None
+    if dedup_cfg.get("enabled", False):
+        mode = dedup_cfg.get("mode", "collapse")
+        kept, groups, report = deduplicate(samples, _detector_from_cfg(dedup_cfg, random_state),
+                                           conflict=dedup_cfg.get("conflict", "majority"))
+        if mode == "collapse":
+            samples, groups = kept, None
+        elif mode == "group_split":
+            _as_group_split_report(report, len(samples))
+        else:
+            raise ValueError(f"dedup.mode phải là 'collapse' hoặc 'group_split', nhận được '{mode}'")
+        report.update(mode=mode)
+
+    labels = [int(s.label) for s in samples]
+    if groups is None:
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        folds = list(splitter.split(np.zeros(len(samples)), labels))
+    else:
+        splitter = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        folds = list(splitter.split(np.zeros(len(samples)), labels, groups))
+    return samples, folds, report
@@ -0,0 +1,99 @@
+# src/models/artifact.py
+import json
+import os
+
+import torch
+from safetensors.torch import load_file, save_file
+from transformers import AutoConfig, AutoTokenizer
+
+from src.models.phobert_classifier import HateSpeechClassifier
+
+ARTIFACT_META = "artifact.json"
+WEIGHTS_FILE = "model.safetensors"
+FORMAT_VERSION = 1
+
+
+def is_artifact(path: str) -> bool:
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, ARTIFACT_META))
+
+
+def export_artifact(checkpoint_path: str, out_dir: str, base_model: str = "vinai/phobert-base-v2",
+                    n_classes: int = 2, max_len: int = 128, idx2label: dict = None):
+    """
+    Bundle a fine-tuned .pth into a self-contained directory: backbone config, tokenizer files,
+    artifact.json and every tensor the module needs in safetensors. Non-persistent buffers
+    (e.g. position_ids) are stored too, so loading never has to run module initializers.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    config = AutoConfig.from_pretrained(base_model)
+    config.save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(base_model).save_pretrained(out_dir)
+
+    # Architecture only (no pretrained download): needed for the non-persistent buffer values
+    model = HateSpeechClassifier(model_name=out_dir, n_classes=n_classes, pretrained=False)
+    model.load_state_dict(torch.load(checkpoint_path, map_location="cpu"))
+
+    tensors = dict(model.state_dict())
+    for name, buffer in model.named_buffers():
+        tensors.setdefault(name, buffer)
+    # safetensors rejects shared or strided storage; each tensor gets its own contiguous block
+    tensors = {name: t.detach().contiguous().clone() for name, t in tensors.items()}
+    save_file(tensors, os.path.join(out_dir, WEIGHTS_FILE), metadata={"format": "pt"})
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "base_model": base_model,
+        "n_classes": n_classes,
+        "max_len": max_len,
+        "idx2label": {str(k): v for k, v in (idx2label or {0: "CLEAN", 1: "TOXIC"}).items()},
+        "source_checkpoint": os.path.basename(checkpoint_path),
+    }
+    with open(os.path.join(out_dir, ARTIFACT_META), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+
+    print(f"--> Đã export artifact tại: {out_dir}")
+    return out_dir
+
+
+def load_artifact_meta(artifact_dir: str) -> dict:
+    with open(os.path.join(artifact_dir, ARTIFACT_META), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Artifact format {meta.get('format_version')} không được hỗ trợ (cần {FORMAT_VERSION})")
+    meta["idx2label"] = {int(k): v for k, v in meta["idx2label"].items()}
+    return meta
+
+
+def load_model_from_artifact(artifact_dir: str, device: str = "cpu") -> HateSpeechClassifier:
+    """
+    Build the classifier on the meta device (no allocation, no random init), then assign
+    memory-mapped safetensors tensors in place. Weights are read once, lazily, straight from the
+    page cache; the Hugging Face cache is never touched.
+    """
+    meta = load_artifact_meta(artifact_dir)
+
+    with torch.device("meta"):
+        model = HateSpeechClassifier(model_name=artifact_dir, n_classes=meta["n_classes"], pretrained=False)
+
+    # On CPU safetensors returns tensors backed by a private mmap of the file (zero-copy)
+    tensors = load_file(os.path.join(artifact_dir, WEIGHTS_FILE), device="cpu")
+
+    persistent_keys = set(model.state_dict().keys())
+    model.load_state_dict({k: v for k, v in tensors.items() if k in persistent_keys}, strict=True, assign=True)
+
+    # Non-persistent buffers are not part of state_dict; put them back on their owning modules
+    for name, tensor in tensors.items():
+        if name in persistent_keys:
+            continue
+        module_path, _, buffer_name = name.rpartition(".")
+        module = model.get_submodule(module_path) if module_path else model
+        module.register_buffer(buffer_name, tensor, persistent=False)
+
+    leftover = [name for name, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if leftover:
+        raise RuntimeError(f"Artifact thiếu tensor: {leftover}")
+
+    model.to(torch.device(device))
+    model.eval()
+    return model
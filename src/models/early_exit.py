@@ -0,0 +1,208 @@
+# src/models/early_exit.py
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from sklearn.metrics import f1_score
+
+from src.models.phobert_classifier import HateSpeechClassifier
+
+CHECKPOINT_FORMAT = "early_exit"
+# Threshold above any softmax confidence: the exit is kept but never taken
+NEVER_EXIT = 1.01
+
+
+class ExitHead(nn.Module):
+    """Pooler-style head on the [CLS] state of an intermediate layer (dense + tanh, dropout, linear)."""
+
+    def __init__(self, hidden_size: int, n_classes: int, dropout: float = 0.1):
+        super().__init__()
+        self.dense = nn.Linear(hidden_size, hidden_size)
+        self.drop = nn.Dropout(p=dropout)
+        self.out = nn.Linear(hidden_size, n_classes)
+
+    def forward(self, hidden_states):
+        return self.out(self.drop(torch.tanh(self.dense(hidden_states[:, 0]))))
+
+
+class EarlyExitClassifier(nn.Module):
+    def __init__(self, base: HateSpeechClassifier, exit_layers: List[int] = (3, 6, 9),
+                 thresholds: Optional[Dict[int, float]] = None):
+        """
+        Fine-tuned HateSpeechClassifier plus classifier heads after selected encoder layers (1-based).
+        The backbone and final head stay frozen and in eval mode; only exit heads train.
+
+        With train_exits=True, forward returns logits of every exit head, shape (batch, exits, classes),
+        for HateSpeechTrainer (see loss/metric_logits). Otherwise forward runs layer by layer, and each
+        sample leaves at the first exit whose softmax confidence reaches its threshold. Samples that never
+        clear a threshold get the full model's answer.
+        """
+        super().__init__()
+        self.base = base
+        n_layers = base.bert.config.num_hidden_layers
+        self.exit_layers = sorted(l for l in exit_layers if 0 < l < n_layers)
+        self.n_layers = n_layers
+        self.heads = nn.ModuleDict({
+            str(l): ExitHead(base.bert.config.hidden_size, base.out.out_features) for l in self.exit_layers
+        })
+        self.thresholds = {l: NEVER_EXIT for l in self.exit_layers}
+        self.thresholds.update(thresholds or {})
+        self.train_exits = False
+
+        for param in self.base.parameters():
+            param.requires_grad_(False)
+
+    def train(self, mode: bool = True):
+        super().train(mode)
+        # The backbone is kept as is: no dropout on it, so exit heads learn from its inference-time features
+        self.base.eval()
+        return self
+
+    # --- Training ---
+
+    def all_exit_logits(self, input_ids, attention_mask):
+        with torch.no_grad():
+            hidden_states = self.base.bert(input_ids=input_ids, attention_mask=attention_mask,
+                                           output_hidden_states=True, return_dict=True).hidden_states
+        # hidden_states[0] is the embedding output, hidden_states[l] the output of layer l
+        return torch.stack([self.heads[str(l)](hidden_states[l]) for l in self.exit_layers], dim=1)
+
+    def loss(self, outputs, labels):
+        """Mean cross-entropy over exit heads; used by HateSpeechTrainer instead of its criterion."""
+        n_exits = outputs.shape[1]
+        return F.cross_entropy(outputs.reshape(-1, outputs.shape[-1]), labels.repeat_interleave(n_exits))
+
+    def metric_logits(self, outputs):
+        # Epoch metrics track the deepest exit head
+        return outputs[:, -1]
+
+    # --- Inference ---
+
+    def forward_with_exits(self, input_ids, attention_mask) -> Tuple[torch.Tensor, torch.Tensor]:
+        """(logits, layers executed) per sample; exited samples are dropped from the batch for later layers."""
+        bert = self.base.bert
+        batch_size = input_ids.shape[0]
+        logits = None
+        exit_layer = torch.full((batch_size,), self.n_layers, dtype=torch.long, device=input_ids.device)
+
+        active = torch.arange(batch_size, device=input_ids.device)
+        hidden = bert.embeddings(input_ids=input_ids)
+        extended_mask = bert.get_extended_attention_mask(attention_mask, input_ids.shape)
+
+        for index, layer in enumerate(bert.encoder.layer, start=1):
+            output = layer(hidden, attention_mask=extended_mask)
+            hidden = output[0] if isinstance(output, tuple) else output
+            if str(index) not in self.heads:
+                continue
+
+            head_logits = self.heads[str(index)](hidden)
+            if logits is None:
+                logits = head_logits.new_empty((batch_size, head_logits.shape[1]))
+            confidence = F.softmax(head_logits, dim=1).max(dim=1).values
+            done = confidence >= self.thresholds[index]
+            if done.any():
+                logits[active[done]] = head_logits[done]
+                exit_layer[active[done]] = index
+                keep = ~done
+                active, hidden, extended_mask = active[keep], hidden[keep], extended_mask[keep]
+                if active.numel() == 0:
+                    return logits, exit_layer
+
+        final_logits = self.base.out(self.base.drop(bert.pooler(hidden)))
+        if logits is None:
+            return final_logits, exit_layer
+        logits[active] = final_logits
+        return logits, exit_layer
+
+    def forward(self, input_ids, attention_mask):
+        if self.train_exits:
+            return self.all_exit_logits(input_ids, attention_mask)
+        return self.forward_with_exits(input_ids, attention_mask)[0]
+
+    # --- Persistence ---
+
+    def save(self, path: str, base_checkpoint: str = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        torch.save({
+            "format": CHECKPOINT_FORMAT,
+            "exit_layers": self.exit_layers,
+            "thresholds": self.thresholds,
+            "base_checkpoint": base_checkpoint,
+            "state_dict": self.state_dict(),
+        }, path)
+
+    @classmethod
+    def from_state(cls, state: dict, model_name: str = "vinai/phobert-base-v2") -> "EarlyExitClassifier":
+        base = HateSpeechClassifier(model_name=model_name, n_classes=2, pretrained=False)
+        model = cls(base, exit_layers=state["exit_layers"], thresholds={int(k): v for k, v in state["thresholds"].items()})
+        model.load_state_dict(state["state_dict"])
+        return model
+
+
+def is_early_exit_checkpoint(state) -> bool:
+    return isinstance(state, dict) and state.get("format") == CHECKPOINT_FORMAT
+
+
+# --- Calibration ---
+
+def collect_exit_probs(model: EarlyExitClassifier, loader, device) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Softmax of every exit head and of the final head over a loader: (exits x N x C, N x C, N labels)."""
+    model.eval()
+    exit_probs, final_probs, labels = [], [], []
+    with torch.inference_mode():
+        for batch in loader:
+            input_ids = batch['input_ids'].to(device)
+            attention_mask = batch['attention_mask'].to(device)
+            exit_probs.append(F.softmax(model.all_exit_logits(input_ids, attention_mask), dim=2).cpu())
+            final_probs.append(F.softmax(model.base(input_ids, attention_mask), dim=1).cpu())
+            labels.append(batch['labels'])
+    return (torch.cat(exit_probs).permute(1, 0, 2).numpy(), torch.cat(final_probs).numpy(),
+            torch.cat(labels).numpy())
+
+
+def simulate_cascade(exit_probs, final_probs, labels, exit_layers: List[int], thresholds: Dict[int, float],
+                     n_layers: int) -> dict:
+    """Predictions, macro-F1 and mean layers executed that forward_with_exits would produce with these thresholds."""
+    preds = final_probs.argmax(axis=1)
+    layers = np.full(len(labels), n_layers)
+    active = np.ones(len(labels), dtype=bool)
+    for k, layer in enumerate(exit_layers):
+        take = active & (exit_probs[k].max(axis=1) >= thresholds[layer])
+        preds[take] = exit_probs[k][take].argmax(axis=1)
+        layers[take] = layer
+        active &= ~take
+    return {
+        "macro_f1": float(f1_score(labels, preds, average='macro')),
+        "accuracy": float((preds == labels).mean()),
+        "avg_layers": float(layers.mean()),
+        "exit_share": {int(l): float((layers == l).mean()) for l in list(exit_layers) + [n_layers]},
+    }
+
+
+def calibrate_thresholds(exit_probs, final_probs, labels, exit_layers: List[int], tolerance: float = 0.0,
+                         min_samples: int = 20, grid=None) -> Dict[int, float]:
+    """
+    Per exit, walking the cascade in order: the lowest confidence threshold at which the samples that would
+    exit there are classified at least as accurately (minus `tolerance`) as the full model classifies them.
+    Exits that never qualify on at least min_samples samples are disabled (NEVER_EXIT).
+    """
+    grid = grid if grid is not None else np.round(np.arange(0.50, 1.0, 0.01), 2)
+    final_correct = final_probs.argmax(axis=1) == labels
+    active = np.ones(len(labels), dtype=bool)
+    thresholds = {}
+    for k, layer in enumerate(exit_layers):
+        confidence = exit_probs[k].max(axis=1)
+        exit_correct = exit_probs[k].argmax(axis=1) == labels
+        thresholds[layer] = NEVER_EXIT
+        for t in grid:
+            take = active & (confidence >= t)
+            if take.sum() < min_samples:
+                break
+            if exit_correct[take].mean() >= final_correct[take].mean() - tolerance:
+                thresholds[layer] = float(t)
+                break
+        active &= ~(confidence >= thresholds[layer])
+    return thresholds
@@ -4,14 +4,25 @@ from transformers import AutoModel, AutoConfig
 
 
 class HateSpeechClassifier(nn.Module):
-    def __init__(self, model_name: str = "vinai/phobert-base-v2", n_classes: int = 2):
+    def __init__(self, model_name: str = "vinai/phobert-base-v2", n_classes: int = 2,
+                 gradient_checkpointing: bool = False, pretrained: bool = True, dropout: float = 0.3):
         super(HateSpeechClassifier, self).__init__()
 
-        # Load PhoBERT backbone for Vietnamese; weights must align with tokenizer used upstream
-        self.bert = AutoModel.from_pretrained(model_name)
+        # Load PhoBERT backbone for Vietnamese; weights must align with tokenizer used upstream.
+        # pretrained=False builds the architecture from config only, for callers that load
+        # fine-tuned weights right after (see src/models/artifact.py) and would discard these anyway
+        if pretrained:
+            self.bert = AutoModel.from_pretrained(model_name)
+        else:
+            self.bert = AutoModel.from_config(AutoConfig.from_pretrained(model_name))
+
+        # Opt-in: recompute encoder activations during backward instead of storing them per layer.
+        # Cuts activation memory roughly by the layer count at the cost of one extra forward per step.
+        if gradient_checkpointing:
+            self.bert.gradient_checkpointing_enable()
 
         # Classification head applied on pooled sentence representation; dropout regularizes fine-tuning
-        self.drop = nn.Dropout(p=0.3)
+        self.drop = nn.Dropout(p=dropout)
         self.out = nn.Linear(self.bert.config.hidden_size, n_classes)
 
     def forward(self, input_ids, attention_mask):
@@ -0,0 +1,188 @@
+# src/services/checkpointing.py
+import glob
+import os
+import queue
+import random
+import re
+import threading
+
+import numpy as np
+import torch
+from torch.utils.data.distributed import DistributedSampler
+
+_CHECKPOINT_PATTERN = re.compile(r"ckpt_step_(\d+)\.pt$")
+
+
+class ResumableSampler(DistributedSampler):
+    """
+    Epoch-seeded shuffling sampler that can fast-forward inside an epoch.
+    The permutation depends only on (seed, epoch), so skipping the first N indices after a restart
+    reproduces exactly the batches the interrupted run had not yet seen. Works single-process
+    (num_replicas=1) and sharded per rank like DistributedSampler.
+    """
+
+    def __init__(self, dataset, num_replicas: int = 1, rank: int = 0, shuffle: bool = True, seed: int = 42):
+        super().__init__(dataset, num_replicas=num_replicas, rank=rank, shuffle=shuffle, seed=seed)
+        self.start_index = 0
+
+    def set_epoch(self, epoch: int):
+        super().set_epoch(epoch)
+        # A new epoch always starts from the beginning; skip() is applied afterwards when resuming
+        self.start_index = 0
+
+    def skip(self, num_samples: int):
+        self.start_index = num_samples
+
+    def __iter__(self):
+        indices = list(super().__iter__())
+        return iter(indices[self.start_index:])
+
+    def __len__(self):
+        return super().__len__() - self.start_index
+
+
+def snapshot(obj):
+    """
+    Detached CPU copy of a (nested) state. Training keeps mutating parameters and optimizer
+    buffers in place, so the background writer must never see live tensors.
+    """
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [snapshot(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(snapshot(v) for v in obj)
+    if isinstance(obj, np.ndarray):
+        return obj.copy()
+    return obj
+
+
+def capture_rng_state() -> dict:
+    state = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state: dict):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+
+def is_training_checkpoint(path: str) -> bool:
+    """Full-state checkpoint written by CheckpointManager (model + optimizer + RNG), not deployable weights."""
+    return bool(_CHECKPOINT_PATTERN.search(os.path.basename(path)))
+
+
+class CheckpointManager:
+    def __init__(self, directory: str, keep_last: int = 3, enabled: bool = True):
+        """
+        Writes full training-state checkpoints from a background thread.
+        save() takes a CPU snapshot synchronously (a memory copy), then hands it to a single writer
+        thread that serializes to a temp file and atomically renames it into place. At most one snapshot
+        waits behind the write in progress, so a slow disk throttles training instead of exhausting RAM.
+        enabled=False (non-zero DDP ranks) turns every call into a no-op.
+        """
+        self.directory = directory
+        self.keep_last = keep_last
+        self.enabled = enabled
+        self._queue = queue.Queue(maxsize=1)
+        self._error = None
+        self._thread = None
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._writer_loop, name="checkpoint-writer", daemon=True)
+            self._thread.start()
+
+    def path_for_step(self, step: int) -> str:
+        return os.path.join(self.directory, f"ckpt_step_{step:08d}.pt")
+
+    def list_checkpoints(self):
+        """Completed checkpoints sorted by step; temp files from interrupted writes are ignored."""
+        found = []
+        for path in glob.glob(os.path.join(self.directory, "ckpt_step_*.pt")):
+            match = _CHECKPOINT_PATTERN.search(os.path.basename(path))
+            if match:
+                found.append((int(match.group(1)), path))
+        return [path for _, path in sorted(found)]
+
+    def latest(self):
+        checkpoints = self.list_checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def save(self, state: dict, step: int):
+        if not self.enabled:
+            return
+        self._raise_pending_error()
+        # Blocks only if the previous write has not finished yet
+        self._queue.put((snapshot(state), self.path_for_step(step), True))
+
+    def save_file(self, state, path: str):
+        """Write an arbitrary state (e.g. inference weights) through the same writer, outside retention."""
+        if not self.enabled:
+            return
+        self._raise_pending_error()
+        self._queue.put((snapshot(state), path, False))
+
+    def wait(self):
+        """Block until every queued checkpoint is on disk; re-raises writer failures."""
+        if not self.enabled:
+            return
+        self._queue.join()
+        self._raise_pending_error()
+
+    def close(self):
+        if not self.enabled or self._thread is None:
+            return
+        self.wait()
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Ghi checkpoint thất bại: {error}") from error
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                state, path, retained = item
+                self._write_atomic(state, path)
+                if retained:
+                    self._apply_retention()
+                print(f"\n--> Đã lưu checkpoint tại: {path}")
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write_atomic(self, state: dict, path: str):
+        # Same directory as the target so os.replace is a rename, never a cross-device copy
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _apply_retention(self):
+        checkpoints = self.list_checkpoints()
+        for path in checkpoints[:-self.keep_last] if self.keep_last > 0 else []:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
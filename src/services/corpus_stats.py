@@ -0,0 +1,227 @@
+# src/services/corpus_stats.py
+import csv
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Dict
+
+from src.services.preprocessing.pipeline import binarize_label
+from src.services.preprocessing.teencode import TeencodeConverter
+
+# 2: sentence-format labels are stored binarized, as training sees them
+STATE_VERSION = 2
+# Leading bytes hashed to detect a source that was rewritten rather than appended to
+FINGERPRINT_BYTES = 65536
+
+
+def is_teencode_suspect(word: str) -> bool:
+    # Teencode-typical letters (j, w, f, z) or a character repeated 3+ times (lozzz, nguuu)
+    return bool(re.search(r'[jwfz]', word) or re.search(r'(.)\1{2,}', word))
+
+
+def _percentiles(hist: Counter, qs=(0.5, 0.9, 0.95, 0.99)) -> dict:
+    total = sum(hist.values())
+    if not total:
+        return {}
+    result, seen = {}, 0
+    targets = sorted(qs)
+    for value in sorted(hist):
+        seen += hist[value]
+        while targets and seen >= targets[0] * total:
+            result[f"p{int(targets.pop(0) * 100)}"] = value
+    result["max"] = max(hist)
+    result["mean"] = sum(v * c for v, c in hist.items()) / total
+    return result
+
+
+def _fingerprint(path: str, length: int) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+class CorpusStats:
+    """
+    Every corpus statistic in one streaming pass: vocabulary, tag histogram, label balance, and
+    character and token length histograms per sentence. State is plain counters, so two states can
+    be merged by addition. Each source remembers the byte offset it was read up to, so appended rows
+    are read without rescanning.
+
+    Sequence CSVs (sentence_id, Word, Tag) are expected to keep a sentence's rows contiguous. The last
+    sentence of a file stays pending until a row of another sentence shows up, because appended data may
+    still continue it. Row-level counts (vocabulary, tags) are committed as soon as a row is read.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.sentences = 0
+        self.vocab = Counter()
+        self.tags = Counter()
+        self.labels = Counter()
+        self.char_lengths = Counter()
+        self.token_lengths = Counter()
+        # path -> {offset, size, fingerprint, header, format, pending}
+        self.sources: Dict[str, dict] = {}
+
+    # --- Ingestion ---
+
+    def update(self, path: str) -> int:
+        """Read whatever of `path` has not been read yet; returns the number of new CSV rows."""
+        key = os.path.abspath(path)
+        size = os.path.getsize(path)
+        source = self.sources.get(key)
+
+        if source is not None:
+            head = min(source["offset"], FINGERPRINT_BYTES)
+            if size < source["offset"] or _fingerprint(path, head) != source["fingerprint"]:
+                # Counters cannot subtract the old contribution of a rewritten file
+                raise ValueError(f"{path} đã bị ghi đè/cắt ngắn kể từ lần quét trước; cần quét lại từ đầu (--rebuild)")
+            if size == source["offset"]:
+                return 0
+        else:
+            source = {"offset": 0, "header": None, "format": None, "pending": None}
+
+        new_rows = 0
+        with open(path, "rb") as f:
+            f.seek(source["offset"])
+            record = b""
+            for raw in f:
+                record += raw
+                # A quoted field may span lines; wait until the quotes balance
+                if record.count(b'"') % 2 or not record.endswith(b"\n"):
+                    continue
+                line, record = record.decode("utf-8-sig" if source["offset"] == 0 else "utf-8"), b""
+                source["offset"] = f.tell()
+                fields = next(csv.reader([line]), [])
+                if not fields:
+                    continue
+                if source["header"] is None:
+                    source["header"] = fields
+                    source["format"] = "sequence" if {"sentence_id", "Word"} <= set(fields) else "sentence"
+                    continue
+                self._consume(source, dict(zip(source["header"], fields)))
+                new_rows += 1
+            # An unterminated last line is left for the next update; offset stays before it
+
+        source["size"] = size
+        source["fingerprint"] = _fingerprint(path, min(source["offset"], FINGERPRINT_BYTES))
+        self.sources[key] = source
+        return new_rows
+
+    def _consume(self, source: dict, row: dict):
+        self.rows += 1
+        if source["format"] == "sentence":
+            text = row.get("sentence", row.get("text", ""))
+            words = text.split()
+            if not words:
+                return
+            self.vocab.update(w.lower() for w in words)
+            # Labels are counted as training sees them: PreprocessingPipeline binarizes the raw value
+            label = binarize_label(row.get("label", row.get("tag", "")))
+            self._commit_sentence(len(text), len(words), str(label))
+            return
+
+        word, tag = row.get("Word", ""), row.get("Tag", "")
+        if tag:
+            self.tags[tag] += 1
+        pending = source["pending"]
+        sentence_id = row.get("sentence_id", "")
+        if pending is not None and pending["sentence_id"] != sentence_id:
+            self._commit_pending(pending)
+            pending = None
+        if pending is None:
+            pending = {"sentence_id": sentence_id, "chars": -1, "tokens": 0, "toxic": False}
+        if word:
+            self.vocab[word.lower()] += 1
+            # Sentence text is the words joined by single spaces, as DataLoader rebuilds it
+            pending["chars"] += len(word) + 1
+            pending["tokens"] += 1
+        # Same binarization as PreprocessingPipeline.run applies to the sentence's joined tag list
+        pending["toxic"] = pending["toxic"] or bool(binarize_label(tag))
+        source["pending"] = pending
+
+    def _commit_pending(self, pending: dict):
+        self._commit_sentence(max(0, pending["chars"]), pending["tokens"], "1" if pending["toxic"] else "0")
+
+    def _commit_sentence(self, chars: int, tokens: int, label: str):
+        self.sentences += 1
+        self.labels[str(label)] += 1
+        self.char_lengths[chars] += 1
+        self.token_lengths[tokens] += 1
+
+    # --- Merging / persistence ---
+
+    def merge(self, other: "CorpusStats") -> "CorpusStats":
+        overlap = set(self.sources) & set(other.sources)
+        if overlap:
+            raise ValueError(f"Hai state cùng chứa nguồn {sorted(overlap)}; gộp sẽ đếm trùng")
+        for name in ("vocab", "tags", "labels", "char_lengths", "token_lengths"):
+            getattr(self, name).update(getattr(other, name))
+        self.rows += other.rows
+        self.sentences += other.sentences
+        self.sources.update(other.sources)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "version": STATE_VERSION,
+            "rows": self.rows,
+            "sentences": self.sentences,
+            "vocab": dict(self.vocab),
+            "tags": dict(self.tags),
+            "labels": dict(self.labels),
+            # JSON keys are strings; lengths are restored to ints on load
+            "char_lengths": {str(k): v for k, v in self.char_lengths.items()},
+            "token_lengths": {str(k): v for k, v in self.token_lengths.items()},
+            "sources": self.sources,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "CorpusStats":
+        if state.get("version") != STATE_VERSION:
+            raise ValueError(f"State phiên bản {state.get('version')} không được hỗ trợ; quét lại với --rebuild")
+        stats = cls()
+        stats.rows, stats.sentences = state["rows"], state["sentences"]
+        stats.vocab, stats.tags, stats.labels = Counter(state["vocab"]), Counter(state["tags"]), Counter(state["labels"])
+        stats.char_lengths = Counter({int(k): v for k, v in state["char_lengths"].items()})
+        stats.token_lengths = Counter({int(k): v for k, v in state["token_lengths"].items()})
+        stats.sources = state["sources"]
+        return stats
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CorpusStats":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    # --- Reporting ---
+
+    def summary(self, top: int = 50) -> dict:
+        """Report view; pending trailing sentences are included here but stay uncommitted in the state."""
+        view = CorpusStats.from_dict(self.to_dict())
+        for source in view.sources.values():
+            if source.get("pending"):
+                view._commit_pending(source["pending"])
+
+        known_teencode = set(TeencodeConverter().teencode_dict)
+        suspects = [(w, c) for w, c in view.vocab.most_common()
+                    if is_teencode_suspect(w) and w not in known_teencode][:top]
+        return {
+            "rows": view.rows,
+            "sentences": view.sentences,
+            "vocab_size": len(view.vocab),
+            "top_words": view.vocab.most_common(top),
+            "teencode_suspects": suspects,
+            "tags": view.tags.most_common(),
+            "labels": dict(sorted(view.labels.items())),
+            "char_length": _percentiles(view.char_lengths),
+            "token_length": _percentiles(view.token_lengths),
+            "sources": {path: {"offset": s["offset"], "format": s["format"]} for path, s in view.sources.items()},
+        }
@@ -0,0 +1,95 @@
+# src/services/distributed.py
+import os
+import socket
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from torch.utils.data import Sampler
+
+
+def find_free_port() -> int:
+    """Ask the OS for an unused TCP port on localhost for the rendezvous store."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def init_distributed(rank: int, world_size: int, master_addr: str = "127.0.0.1",
+                     master_port: int = 29500, backend: str = "gloo"):
+    """
+    Join the process group. gloo is the CPU backend; every rank must call this with the same
+    master_addr/master_port before any collective is issued.
+    """
+    os.environ["MASTER_ADDR"] = master_addr
+    os.environ["MASTER_PORT"] = str(master_port)
+    dist.init_process_group(backend=backend, rank=rank, world_size=world_size)
+
+
+def cleanup_distributed():
+    if is_distributed():
+        dist.destroy_process_group()
+
+
+def is_distributed() -> bool:
+    return dist.is_available() and dist.is_initialized()
+
+
+def get_rank() -> int:
+    return dist.get_rank() if is_distributed() else 0
+
+
+def get_world_size() -> int:
+    return dist.get_world_size() if is_distributed() else 1
+
+
+def is_main_process() -> bool:
+    # Rank 0 owns side effects: checkpoints, progress bars, reports
+    return get_rank() == 0
+
+
+def barrier():
+    if is_distributed():
+        dist.barrier()
+
+
+def all_reduce_sum(value: float) -> float:
+    """Sum a Python scalar across ranks; identity when running single-process."""
+    if not is_distributed():
+        return value
+    tensor = torch.tensor([value], dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.item()
+
+
+def all_gather_arrays(array: np.ndarray) -> np.ndarray:
+    """
+    Concatenate per-rank arrays along axis 0 in rank order. Shards may differ in length,
+    so arrays travel as pickled objects rather than fixed-size tensors.
+    """
+    if not is_distributed():
+        return array
+    gathered = [None] * get_world_size()
+    dist.all_gather_object(gathered, array)
+    # Empty shards may carry a placeholder shape; drop them so concatenation sees consistent trailing dims
+    non_empty = [a for a in gathered if len(a)]
+    return np.concatenate(non_empty, axis=0) if non_empty else array
+
+
+class EvalShardSampler(Sampler):
+    """
+    Strided, non-padded shard of a dataset for evaluation. Unlike DistributedSampler it never
+    duplicates samples to even out ranks, so gathered metrics match a single-process pass exactly.
+    Ranks may see different batch counts, so evaluation must not run DDP collectives per batch.
+    """
+
+    def __init__(self, dataset, num_replicas: int = None, rank: int = None):
+        self.dataset = dataset
+        self.num_replicas = num_replicas if num_replicas is not None else get_world_size()
+        self.rank = rank if rank is not None else get_rank()
+
+    def __iter__(self):
+        return iter(range(self.rank, len(self.dataset), self.num_replicas))
+
+    def __len__(self):
+        return len(range(self.rank, len(self.dataset), self.num_replicas))
@@ -0,0 +1,187 @@
+# src/services/evaluation.py
+import json
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from sklearn.metrics import accuracy_score, f1_score
+
+from src.models.artifact import is_artifact, load_model_from_artifact
+from src.models.early_exit import EarlyExitClassifier, is_early_exit_checkpoint
+from src.models.phobert_classifier import HateSpeechClassifier
+from src.services.checkpointing import is_training_checkpoint
+from src.services.tokenization import CachedTokenizer
+
+# Written by evaluate_checkpoints.py; read by the API server and infer.py to pick the serving checkpoint
+BEST_CHECKPOINT_MARKER = "models/best_checkpoint.json"
+THRESHOLDS = [round(t, 2) for t in np.arange(0.05, 0.96, 0.05)]
+
+
+class BatchPlan:
+    def __init__(self, texts: List[str], labels: List[int], tokenizer: CachedTokenizer, max_len: int = 128,
+                 batch_size: int = 64):
+        """
+        Held-out set tokenized once, sorted by length and cut into batches that are each padded only to
+        their longest row. Tensors can be moved to shared memory so worker processes map the same pages
+        instead of re-tokenizing per checkpoint.
+        """
+        encoding = tokenizer.encode_batch(texts, max_len)
+        lengths = encoding['attention_mask'].sum(dim=1)
+        # Stable sort keeps equal-length rows in input order, so the plan is deterministic
+        self.order = torch.argsort(lengths, stable=True)
+        self.input_ids = encoding['input_ids'][self.order].contiguous()
+        self.attention_mask = encoding['attention_mask'][self.order].contiguous()
+        self.labels = torch.tensor(labels, dtype=torch.long)
+        sorted_lengths = lengths[self.order].tolist()
+
+        # (start, end, width) per batch; width is the longest row in the batch
+        self.batches = [(start, min(start + batch_size, len(texts)),
+                         int(sorted_lengths[min(start + batch_size, len(texts)) - 1]))
+                        for start in range(0, len(texts), batch_size)]
+        self.padded_tokens = sum((end - start) * width for start, end, width in self.batches)
+        self.real_tokens = int(lengths.sum())
+
+    def __len__(self):
+        return len(self.labels)
+
+    def share_memory(self) -> "BatchPlan":
+        for tensor in (self.order, self.input_ids, self.attention_mask, self.labels):
+            tensor.share_memory_()
+        return self
+
+
+def load_classifier(path: str, device: str = "cpu") -> HateSpeechClassifier:
+    """Artifact directory, epoch .pth (state_dict), full-state training checkpoint ('model' key) or early-exit model."""
+    if is_artifact(path):
+        return load_model_from_artifact(path, device=device)
+    # Full-state checkpoints carry RNG state (numpy arrays, Python tuples) that the weights_only unpickler
+    # rejects; they are this project's own training output, so only they are loaded with the full unpickler
+    full_state = is_training_checkpoint(path)
+    state = torch.load(path, map_location=device, weights_only=not full_state)
+    if is_early_exit_checkpoint(state):
+        # Scored with its calibrated exits, i.e. exactly as the predictor would serve it
+        model = EarlyExitClassifier.from_state(state)
+        model.to(device)
+        model.eval()
+        return model
+    if full_state:
+        state = state['model']
+    model = HateSpeechClassifier(n_classes=2, pretrained=False)
+    model.load_state_dict(state)
+    model.to(device)
+    model.eval()
+    return model
+
+
+def score_checkpoint(path: str, plan: BatchPlan, device: str = "cpu") -> dict:
+    """Run the plan through one checkpoint; probabilities come back in the held-out set's original order."""
+    start = time.perf_counter()
+    model = load_classifier(path, device=device)
+    load_seconds = time.perf_counter() - start
+
+    sorted_probs, batch_seconds = [], []
+    with torch.inference_mode():
+        for begin, end, width in plan.batches:
+            input_ids = plan.input_ids[begin:end, :width].to(device)
+            attention_mask = plan.attention_mask[begin:end, :width].to(device)
+            tick = time.perf_counter()
+            logits = model(input_ids, attention_mask)
+            sorted_probs.append(torch.softmax(logits, dim=1).cpu())
+            batch_seconds.append(time.perf_counter() - tick)
+
+    probs = torch.empty((len(plan), sorted_probs[0].shape[1]))
+    probs[plan.order] = torch.cat(sorted_probs)
+    return {"path": path, "probs": probs.numpy(), "load_seconds": load_seconds, "batch_seconds": batch_seconds}
+
+
+def summarize(result: dict, labels: np.ndarray) -> dict:
+    probs = result["probs"]
+    preds = probs.argmax(axis=1)
+    batch_ms = np.array(result["batch_seconds"]) * 1000
+    summary = {
+        "checkpoint": os.path.basename(os.path.normpath(result["path"])),
+        "path": result["path"],
+        "accuracy": float(accuracy_score(labels, preds)),
+        "macro_f1": float(f1_score(labels, preds, average='macro')),
+        "load_seconds": result["load_seconds"],
+        "ms_per_sample": float(batch_ms.sum() / len(labels)),
+        "p50_batch_ms": float(np.percentile(batch_ms, 50)),
+        "p95_batch_ms": float(np.percentile(batch_ms, 95)),
+        "samples_per_sec": float(len(labels) / (batch_ms.sum() / 1000)),
+    }
+
+    # Binary models: macro-F1 when TOXIC is predicted at P(TOXIC) >= t instead of argmax
+    if probs.shape[1] == 2:
+        sweep = {t: float(f1_score(labels, (probs[:, 1] >= t).astype(int), average='macro')) for t in THRESHOLDS}
+        best = max(sweep, key=sweep.get)
+        summary.update(threshold_sweep=sweep, best_threshold=best, best_threshold_f1=sweep[best])
+    return summary
+
+
+_PLAN: Optional[BatchPlan] = None
+
+
+def _init_worker(plan: BatchPlan, threads: int):
+    global _PLAN
+    _PLAN = plan
+    # Each worker gets a slice of the cores; together they fill the machine without oversubscription
+    torch.set_num_threads(threads)
+
+
+def _score_in_worker(path: str) -> dict:
+    return score_checkpoint(path, _PLAN)
+
+
+def evaluate_checkpoints(paths: List[str], plan: BatchPlan, workers: int = 1,
+                         threads_per_worker: int = None) -> List[dict]:
+    """Score every checkpoint on CPU worker processes sharing one plan; returns the leaderboard, best first."""
+    labels = plan.labels.numpy().copy()
+    if workers <= 1:
+        results = [score_checkpoint(path, plan) for path in paths]
+    else:
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+        threads = threads_per_worker or max(1, cores // workers)
+        plan.share_memory()
+        # spawn, not fork: forking after the parent has touched OpenMP is unsafe
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(plan, threads)) as pool:
+            results = list(pool.imap_unordered(_score_in_worker, paths))
+
+    leaderboard = [summarize(r, labels) for r in results]
+    # Serving decides by argmax, so that F1 ranks; latency breaks ties
+    leaderboard.sort(key=lambda s: (-s["macro_f1"], s["ms_per_sample"]))
+    return leaderboard
+
+
+def best_deployable(leaderboard: List[dict]) -> Optional[dict]:
+    """Highest-ranked entry the predictor can serve: epoch .pth, early-exit model or artifact, not a full-state checkpoint."""
+    return next((entry for entry in leaderboard if not is_training_checkpoint(entry["path"])), None)
+
+
+def write_best_checkpoint(entry: dict, base_dir: str = ".", marker: str = BEST_CHECKPOINT_MARKER):
+    if is_training_checkpoint(entry["path"]):
+        raise ValueError(f"{entry['path']} là checkpoint huấn luyện đầy đủ, không dùng để serving được")
+    path = os.path.join(base_dir, marker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "model_path": os.path.relpath(entry["path"], base_dir),
+            "macro_f1": entry["macro_f1"],
+            "accuracy": entry["accuracy"],
+            "best_threshold": entry.get("best_threshold"),
+            "selected_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_best_checkpoint(base_dir: str = ".", marker: str = BEST_CHECKPOINT_MARKER) -> Optional[str]:
+    """Path (relative to base_dir) of the checkpoint marked for serving, or None when nothing is marked."""
+    path = os.path.join(base_dir, marker)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("model_path")
@@ -0,0 +1,200 @@
+# src/services/executor.py
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import torch
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised by submit() when the bounded request queue is full; callers should shed load."""
+
+
+def detect_cpu_budget() -> int:
+    """
+    Cores this process may use: the affinity mask (honours taskset/cgroups/--pin) capped by the
+    intra-op budget already set on torch, e.g. per worker by serve_shared.py.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+    return max(1, min(cores, torch.get_num_threads()))
+
+
+def default_layout(cpu_budget: int):
+    """
+    (lanes, threads_per_lane) for a core budget. BERT-base forward passes stop scaling well past
+    ~4 intra-op threads, so extra cores become extra lanes rather than wider lanes.
+    """
+    lanes = max(1, cpu_budget // 4)
+    return lanes, max(1, cpu_budget // lanes)
+
+
+class _LaneStats:
+    def __init__(self, window: int = 1024):
+        self.lock = threading.Lock()
+        self.jobs = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.total_exec = 0.0
+        self.recent_wait = deque(maxlen=window)
+        self.recent_exec = deque(maxlen=window)
+
+    def record(self, wait: float, exec_time: float, failed: bool):
+        with self.lock:
+            self.jobs += 1
+            self.errors += int(failed)
+            self.total_wait += wait
+            self.total_exec += exec_time
+            self.recent_wait.append(wait)
+            self.recent_exec.append(exec_time)
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "jobs": self.jobs,
+                "errors": self.errors,
+                "avg_queue_ms": self.total_wait / self.jobs * 1000 if self.jobs else 0.0,
+                "avg_exec_ms": self.total_exec / self.jobs * 1000 if self.jobs else 0.0,
+                "p95_queue_ms": self._percentile(self.recent_wait, 0.95) * 1000,
+                "p95_exec_ms": self._percentile(self.recent_exec, 0.95) * 1000,
+            }
+
+
+class InferenceExecutor:
+    def __init__(self, lanes: int = None, threads_per_lane: int = None, interop_threads: int = 1,
+                 cpu_sets: Optional[List[List[int]]] = None, pin: bool = False, queue_size: int = 64):
+        """
+        Fixed pool of model lanes fed by one bounded queue. Each lane is a dedicated thread with its
+        own intra-op thread count (OpenMP's thread count is per calling thread), so at most `lanes`
+        forward passes run at once and their threads add up to the core budget instead of each
+        grabbing every core. Lanes may be pinned to CPU sets; pin=True splits the affinity mask evenly.
+        """
+        budget = detect_cpu_budget()
+        if lanes is None and threads_per_lane is None:
+            lanes, threads_per_lane = default_layout(budget)
+        # Whichever side is unspecified is derived so lanes * threads_per_lane fills the budget
+        self.lanes = lanes or max(1, budget // threads_per_lane)
+        self.threads_per_lane = threads_per_lane or max(1, budget // self.lanes)
+        self.queue_size = queue_size
+
+        if cpu_sets is None and pin and hasattr(os, "sched_getaffinity"):
+            cores = sorted(os.sched_getaffinity(0))
+            cpu_sets = [cores[i * self.threads_per_lane:(i + 1) * self.threads_per_lane] or cores
+                        for i in range(self.lanes)]
+        self.cpu_sets = cpu_sets
+
+        # Inter-op pool is process-wide and can only be sized before first use; ignore if already fixed
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            pass
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats = [_LaneStats() for _ in range(self.lanes)]
+        self._threads = []
+        for index in range(self.lanes):
+            thread = threading.Thread(target=self._lane_loop, args=(index,), name=f"inference-lane-{index}",
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        print(f"--> [Executor] {self.lanes} lane x {self.threads_per_lane} thread"
+              f"{' (pinned)' if self.cpu_sets else ''}, queue {queue_size}")
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn(*args) for a lane; raises ExecutorSaturatedError immediately when the queue is full."""
+        future = Future()
+        try:
+            self._queue.put_nowait((fn, args, kwargs, future, time.perf_counter()))
+        except queue.Full:
+            raise ExecutorSaturatedError(f"Hàng đợi suy luận đầy ({self.queue_size})")
+        return future
+
+    def broadcast(self, fn: Callable, timeout: float = None):
+        """
+        Run fn once on every lane (e.g. warmup: each lane owns its own OpenMP thread team).
+        A barrier holds each lane after its call, so no lane can take two of the broadcast jobs.
+        """
+        barrier = threading.Barrier(self.lanes)
+
+        def run_then_wait():
+            try:
+                return fn()
+            finally:
+                barrier.wait()
+
+        futures = []
+        for _ in range(self.lanes):
+            future = Future()
+            self._queue.put((run_then_wait, (), {}, future, time.perf_counter()))
+            futures.append(future)
+        return [f.result(timeout) for f in futures]
+
+    def run(self, fn: Callable, *args, timeout: float = None, **kwargs):
+        """
+        Run fn(*args) on a lane and wait for its result. Unlike submit(), this blocks while the queue is
+        full instead of rejecting: for control work (canary checks) that must not be dropped.
+        """
+        future = Future()
+        self._queue.put((fn, args, kwargs, future, time.perf_counter()))
+        return future.result(timeout)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "lanes": self.lanes,
+            "threads_per_lane": self.threads_per_lane,
+            "cpu_sets": self.cpu_sets,
+            "queue_depth": self.queue_depth(),
+            "queue_size": self.queue_size,
+            "per_lane": [s.snapshot() for s in self._stats],
+        }
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _lane_loop(self, index: int):
+        # Applies to this thread's OpenMP team only; other lanes keep their own count
+        torch.set_num_threads(self.threads_per_lane)
+        if self.cpu_sets and hasattr(os, "sched_setaffinity"):
+            # pid 0 = calling thread on Linux; OpenMP workers spawned later inherit the mask
+            os.sched_setaffinity(0, set(self.cpu_sets[index % len(self.cpu_sets)]))
+
+        stats = self._stats[index]
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args, kwargs, future, enqueued_at = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            started = time.perf_counter()
+            failed = False
+            try:
+                with torch.inference_mode():
+                    result = fn(*args, **kwargs)
+                future.set_result(result)
+            except BaseException as e:
+                failed = True
+                future.set_exception(e)
+            stats.record(started - enqueued_at, time.perf_counter() - started, failed)
@@ -0,0 +1,121 @@
+# src/services/memory_probe.py
+import gc
+from typing import List, Optional, Tuple
+
+import torch
+
+from src.utils.memory import available_memory_mb, peak_rss_mb, reset_peak_rss
+
+
+class MemoryProbe:
+    def __init__(self, model, budget_mb: float, device: str = "cpu"):
+        """
+        Finds the largest (batch_size, max_len) whose training step fits a memory budget.
+        Each candidate runs one synthetic forward+backward pass on the real model; the measured peak
+        (RSS on CPU, allocator peak on CUDA) plus the AdamW state that the first optimizer step will
+        allocate must stay under budget_mb.
+        """
+        self.model = model
+        self.budget_mb = budget_mb
+        self.device = torch.device(device)
+        self.model.to(self.device)
+
+        config = self.model.bert.config
+        self.vocab_size = config.vocab_size
+        # RoBERTa-style position ids start after padding_idx, so usable length is max_position_embeddings - 2
+        self.max_supported_len = config.max_position_embeddings - 2
+
+        # AdamW keeps exp_avg and exp_avg_sq per trainable parameter; not allocated until the first step
+        trainable_bytes = sum(p.numel() * p.element_size() for p in self.model.parameters() if p.requires_grad)
+        self.optimizer_state_mb = 2 * trainable_bytes / (1024 * 1024)
+
+    @staticmethod
+    def resolve_budget(budget) -> Optional[float]:
+        """Config value -> MB. 'auto' takes 80% of currently available RAM; None disables probing."""
+        if budget is None:
+            return None
+        if isinstance(budget, str) and budget.lower() == "auto":
+            available = available_memory_mb()
+            return available * 0.8 if available else None
+        return float(budget)
+
+    def _reset_peak(self):
+        if self.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(self.device)
+        else:
+            reset_peak_rss()
+
+    def _read_peak(self) -> float:
+        if self.device.type == "cuda":
+            return torch.cuda.max_memory_allocated(self.device) / (1024 * 1024)
+        return peak_rss_mb()
+
+    def measure(self, batch_size: int, seq_len: int) -> float:
+        """Peak memory in MB of one training step at the given shape, including future optimizer state."""
+        was_training = self.model.training
+        self.model.train()
+        self.model.zero_grad(set_to_none=True)
+        gc.collect()
+        self._reset_peak()
+
+        # Avoid low ids so synthetic batches never contain special/padding tokens
+        input_ids = torch.randint(5, self.vocab_size, (batch_size, seq_len), device=self.device)
+        attention_mask = torch.ones((batch_size, seq_len), dtype=torch.long, device=self.device)
+        labels = torch.zeros(batch_size, dtype=torch.long, device=self.device)
+
+        try:
+            logits = self.model(input_ids, attention_mask)
+            loss = torch.nn.functional.cross_entropy(logits, labels)
+            loss.backward()
+            peak = self._read_peak()
+        finally:
+            # Leave the model exactly as the trainer expects it: no stale grads, original mode
+            self.model.zero_grad(set_to_none=True)
+            self.model.train(was_training)
+            del input_ids, attention_mask, labels
+            gc.collect()
+            if self.device.type == "cuda":
+                torch.cuda.empty_cache()
+
+        return peak + self.optimizer_state_mb
+
+    def find_max_config(self, batch_sizes: List[int], seq_lens: List[int]) -> Tuple[int, int, float]:
+        """
+        Prefer the longest sequence length (truncation costs accuracy), then the largest batch size at it.
+        Returns (batch_size, seq_len, peak_mb). Raises RuntimeError when even the smallest shape does not fit.
+        """
+        for seq_len in sorted(set(seq_lens), reverse=True):
+            if seq_len > self.max_supported_len:
+                print(f"--> [MemoryProbe] Bỏ qua max_len={seq_len} (model chỉ hỗ trợ {self.max_supported_len})")
+                continue
+
+            best = None
+            history = []
+            for batch_size in sorted(set(batch_sizes)):
+                # Activation memory grows ~linearly with tokens; skip shapes the trend says will not fit
+                if len(history) >= 2:
+                    (t0, m0), (t1, m1) = history[-2], history[-1]
+                    tokens = batch_size * seq_len
+                    predicted = m1 + (m1 - m0) / max(t1 - t0, 1) * (tokens - t1)
+                    if predicted > self.budget_mb:
+                        print(f"--> [MemoryProbe] batch={batch_size}, max_len={seq_len}: "
+                              f"dự đoán {predicted:.0f}MB > {self.budget_mb:.0f}MB, dừng")
+                        break
+
+                try:
+                    peak = self.measure(batch_size, seq_len)
+                except RuntimeError as e:
+                    # Allocation failures (CPU allocator or CUDA OOM) mean this shape does not fit
+                    print(f"--> [MemoryProbe] batch={batch_size}, max_len={seq_len}: lỗi cấp phát ({e})")
+                    break
+
+                print(f"--> [MemoryProbe] batch={batch_size}, max_len={seq_len}: peak {peak:.0f}MB")
+                if peak > self.budget_mb:
+                    break
+                best = (batch_size, seq_len, peak)
+                history.append((batch_size * seq_len, peak))
+
+            if best is not None:
+                return best
+
+        raise RuntimeError(f"Không có cấu hình nào vừa ngân sách bộ nhớ {self.budget_mb:.0f}MB")
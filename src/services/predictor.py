@@ -1,8 +1,13 @@
 # src/services/predictor.py
+from typing import List
+
 import torch
 from transformers import AutoTokenizer
 from src.models.phobert_classifier import HateSpeechClassifier
+from src.models.artifact import is_artifact, load_artifact_meta, load_model_from_artifact
+from src.models.early_exit import EarlyExitClassifier, is_early_exit_checkpoint
 from src.services.preprocessing.pipeline import PreprocessingPipeline
+from src.services.tokenization import CachedTokenizer
 
 
 class HateSpeechPredictor:
@@ -10,17 +15,37 @@ class HateSpeechPredictor:
         # Inference path: deterministic, no gradients; device selection affects latency and memory only
         self.device = torch.device(device)
         self.pipeline = PreprocessingPipeline()
+        self.max_len = 128
+        self.early_exit = False
 
-        # Tokenizer must match PhoBERT backbone to keep vocabulary/segmentation consistent
-        self.tokenizer = AutoTokenizer.from_pretrained("vinai/phobert-base-v2")
+        # Exported artifact (see export_model.py): config, tokenizer and weights from one directory,
+        # weights memory-mapped once with no pretrained initialization
+        if is_artifact(model_path):
+            meta = load_artifact_meta(model_path)
+            self.tokenizer = CachedTokenizer(AutoTokenizer.from_pretrained(model_path))
+            self.model = load_model_from_artifact(model_path, device=device)
+            self.max_len = meta['max_len']
+            self.idx2label = meta['idx2label']
+            print("--> Đã load model (artifact) thành công!")
+            return
 
-        # Architecture mirrors training-time model to ensure weight compatibility
-        self.model = HateSpeechClassifier(n_classes=2)
+        # Tokenizer must match PhoBERT backbone to keep vocabulary/segmentation consistent; chat vocabulary
+        # repeats heavily, so per-word BPE results are memoized (output identical to the plain tokenizer)
+        self.tokenizer = CachedTokenizer(AutoTokenizer.from_pretrained("vinai/phobert-base-v2"))
 
-        # Load weights serialized during training; eval() disables stochastic layers for stable predictions
+        # Load weights serialized during training; eval() disables stochastic layers for stable predictions.
+        # The file decides the architecture, so nothing is constructed before it has been read
         try:
             state_dict = torch.load(model_path, map_location=self.device)
-            self.model.load_state_dict(state_dict)
+            if is_early_exit_checkpoint(state_dict):
+                # Exit heads on intermediate layers (train_early_exit.py): confident samples stop early
+                self.model = EarlyExitClassifier.from_state(state_dict)
+                self.early_exit = True
+            else:
+                # Architecture mirrors training-time model to ensure weight compatibility; pretrained weights
+                # are skipped because the fine-tuned checkpoint overwrites every one of them
+                self.model = HateSpeechClassifier(n_classes=2, pretrained=False)
+                self.model.load_state_dict(state_dict)
             self.model.to(self.device)
             self.model.eval()
             print("--> Đã load model thành công!")
@@ -32,30 +57,39 @@ class HateSpeechPredictor:
         self.idx2label = {0: "CLEAN", 1: "TOXIC"}
 
     def predict(self, text: str):
+        return self.predict_batch([text])[0]
+
+    def predict_batch(self, texts: List[str]) -> List[dict]:
+        """Score several texts in one forward pass; results keep input order and match predict() per text."""
         # Preprocessing must mirror training-time transformations to avoid distribution shift
-        clean_text = self.pipeline.process_text(text)
+        clean_texts = [self.pipeline.process_text(text) for text in texts]
 
-        encoding = self.tokenizer.encode_plus(
-            clean_text,
-            max_length=128,
-            padding='max_length',
-            truncation=True,
-            return_tensors='pt'
-        )
+        encoding = self.tokenizer.encode_batch(clean_texts, self.max_len)
 
         input_ids = encoding['input_ids'].to(self.device)
         attention_mask = encoding['attention_mask'].to(self.device)
 
         # Inference produces logits; softmax used only for reporting confidence, not decision thresholds
         with torch.no_grad():
-            outputs = self.model(input_ids, attention_mask)
+            if self.early_exit:
+                # Each sample leaves at its own exit; exit_layers records how many encoder layers it ran
+                outputs, exit_layers = self.model.forward_with_exits(input_ids, attention_mask)
+            else:
+                outputs = self.model(input_ids, attention_mask)
             probs = torch.nn.functional.softmax(outputs, dim=1)
-            pred_idx = torch.argmax(probs, dim=1).item()
-            confidence = probs[0][pred_idx].item()
-
-        return {
-            "text_input": text,
-            "text_clean": clean_text,
-            "label": self.idx2label[pred_idx],
-            "confidence": f"{confidence:.2%}"
-        }
\ No newline at end of file
+            confidences, pred_idxs = torch.max(probs, dim=1)
+
+        results = [
+            {
+                "text_input": text,
+                "text_clean": clean_text,
+                "label": self.idx2label[pred_idx],
+                "confidence": f"{confidence:.2%}"
+            }
+            for text, clean_text, pred_idx, confidence
+            in zip(texts, clean_texts, pred_idxs.tolist(), confidences.tolist())
+        ]
+        if self.early_exit:
+            for result, layer in zip(results, exit_layers.tolist()):
+                result["exit_layer"] = layer
+        return results
@@ -3,6 +3,14 @@ from .teencode import TeencodeConverter
 from typing import List
 from src.core.dtos import HateSpeechSample
 
+# Chỉ có tag B-T và I-T là độc hại
+TOXIC_TAGS = ("B-T", "I-T")
+
+
+def binarize_label(label_str: str) -> int:
+    """Nhãn huấn luyện 0/1: TOXIC khi chuỗi nhãn/tag chứa B-T hoặc I-T (corpus_stats dùng cùng luật này)."""
+    return 1 if any(tag in label_str for tag in TOXIC_TAGS) else 0
+
 
 class PreprocessingPipeline:
     def __init__(self):
@@ -27,11 +35,7 @@ class PreprocessingPipeline:
             label_str = item.label
 
             # --- LOGIC NHỊ PHÂN (0 vs 1) ---
-            # Chỉ có tag B-T và I-T là độc hại
-            if "B-T" in label_str or "I-T" in label_str:
-                final_label = 1  # TOXIC
-            else:
-                final_label = 0  # CLEAN
+            final_label = binarize_label(label_str)  # 1: TOXIC, 0: CLEAN
 
             processed_data.append(HateSpeechSample(text=clean_text, label=str(final_label)))
 
@@ -0,0 +1,216 @@
+# src/services/sweep.py
+import contextlib
+import itertools
+import statistics
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from torch.utils.data import RandomSampler, SequentialSampler
+
+from src.core.dataset import PretokenizedDataset, build_data_loader
+from src.models.phobert_classifier import HateSpeechClassifier
+from src.services.executor import default_layout, detect_cpu_budget
+from src.services.tokenization import CachedTokenizer
+from src.services.trainer import HateSpeechTrainer
+
+# Hyperparameters a trial can vary; anything not in the grid comes from training.* in config.yaml
+SEARCH_SPACE = ("lr", "max_len", "dropout", "batch_size")
+
+
+class TokenizedCorpus:
+    def __init__(self, texts: List[str], labels: List[int], tokenizer: CachedTokenizer, max_lens: Sequence[int]):
+        """
+        The whole (preprocessed, deduplicated) corpus tokenized once at the longest max_len in the sweep.
+        Shorter lengths are derived by slicing with the closing special tokens put back (see
+        CachedTokenizer.shorten), so every trial and fold reads the same rows without touching the tokenizer.
+        """
+        longest = max(max_lens)
+        full = tokenizer.encode_batch(texts, longest)
+        self.encodings: Dict[int, Tuple[torch.Tensor, torch.Tensor]] = {}
+        for max_len in sorted(set(max_lens)):
+            if max_len == longest:
+                encoding = full
+            elif tokenizer.can_shorten:
+                encoding = tokenizer.shorten(full, max_len)
+            else:
+                encoding = tokenizer.encode_batch(texts, max_len)
+            self.encodings[max_len] = (encoding['input_ids'].contiguous(), encoding['attention_mask'].contiguous())
+        self.labels = torch.tensor(labels, dtype=torch.long)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def share_memory(self) -> "TokenizedCorpus":
+        self.labels.share_memory_()
+        for input_ids, attention_mask in self.encodings.values():
+            input_ids.share_memory_()
+            attention_mask.share_memory_()
+        return self
+
+
+def build_trials(grid: Dict[str, list], defaults: Dict[str, float]) -> List[dict]:
+    """Cartesian product of the grid; parameters without grid values take their training default."""
+    unknown = set(grid) - set(SEARCH_SPACE)
+    if unknown:
+        raise ValueError(f"Tham số sweep không hỗ trợ: {sorted(unknown)} (chỉ {SEARCH_SPACE})")
+    axes = [grid.get(name) or [defaults[name]] for name in SEARCH_SPACE]
+    return [dict(zip(SEARCH_SPACE, values)) for values in itertools.product(*axes)]
+
+
+def build_tasks(trials: List[dict], n_folds: int, epochs: int, seed: int = 42) -> List[dict]:
+    # Fold-major: all trials of one fold run side by side, so early stopping compares like with like early on
+    return [{"trial": trial_id, "fold": fold, "params": params, "epochs": epochs, "seed": seed}
+            for fold in range(n_folds) for trial_id, params in enumerate(trials)]
+
+
+class MedianStopping:
+    def __init__(self, reports, lock=None, min_epochs: int = 1, min_peers: int = 3):
+        """
+        Median stopping rule: after epoch e (e >= min_epochs), a trial whose best validation F1 so far is
+        below the median of other trials' best-so-far at epoch e on the same fold is stopped. Needs at
+        least min_peers reports to compare against; reports/lock are shared across worker processes.
+        """
+        self.reports = reports
+        self.lock = lock if lock is not None else contextlib.nullcontext()
+        self.min_epochs = min_epochs
+        self.min_peers = min_peers
+
+    def report(self, trial: int, fold: int, epoch: int, best_f1: float) -> bool:
+        """Record the trial's progress; True when it should stop."""
+        with self.lock:
+            peers = [f1 for t, f, e, f1 in self.reports if f == fold and e == epoch and t != trial]
+            self.reports.append((trial, fold, epoch, best_f1))
+        if epoch < self.min_epochs or len(peers) < self.min_peers:
+            return False
+        return best_f1 < statistics.median(peers)
+
+
+def run_trial(task: dict, corpus: TokenizedCorpus, folds: List[Tuple[np.ndarray, np.ndarray]],
+              stopping: Optional[MedianStopping] = None) -> dict:
+    """Train one (hyperparameters, fold) pair on CPU; returns its validation F1 history and status."""
+    params = task["params"]
+    torch.manual_seed(task["seed"])
+    start = time.perf_counter()
+
+    input_ids, attention_mask = corpus.encodings[params["max_len"]]
+    train_idx, val_idx = folds[task["fold"]]
+    train_dataset = PretokenizedDataset(input_ids, attention_mask, corpus.labels, train_idx)
+    val_dataset = PretokenizedDataset(input_ids, attention_mask, corpus.labels, val_idx)
+    batch_size = int(params["batch_size"])
+    # Rows are already tokenized, so batches are plain tensor indexing: no loader workers needed
+    train_loader = build_data_loader(
+        train_dataset, RandomSampler(train_dataset, generator=torch.Generator().manual_seed(task["seed"])), batch_size
+    )
+    val_loader = build_data_loader(val_dataset, SequentialSampler(val_dataset), batch_size)
+
+    model = HateSpeechClassifier(n_classes=2, dropout=float(params["dropout"]))
+    trainer = HateSpeechTrainer(model, train_loader, val_loader, device="cpu", lr=float(params["lr"]))
+
+    history, status = [], "completed"
+    for epoch in range(1, task["epochs"] + 1):
+        trainer.train_one_epoch(epoch)
+        _, val_acc, val_f1 = trainer.evaluate()
+        history.append({"epoch": epoch, "val_f1": float(val_f1), "val_acc": float(val_acc)})
+        best_f1 = max(h["val_f1"] for h in history)
+        if stopping is not None and stopping.report(task["trial"], task["fold"], epoch, best_f1) \
+                and epoch < task["epochs"]:
+            status = "pruned"
+            break
+
+    return {
+        "trial": task["trial"],
+        "fold": task["fold"],
+        "params": params,
+        "status": status,
+        "history": history,
+        "best_f1": max(h["val_f1"] for h in history),
+        "epochs_run": len(history),
+        "seconds": time.perf_counter() - start,
+        "samples_per_sec": float(np.mean([s["samples_per_sec"] for s in trainer.epoch_stats])),
+    }
+
+
+_CORPUS: Optional[TokenizedCorpus] = None
+_FOLDS = None
+_STOPPING: Optional[MedianStopping] = None
+
+
+def _init_worker(corpus: TokenizedCorpus, folds, stopping: Optional[MedianStopping], threads: int):
+    global _CORPUS, _FOLDS, _STOPPING
+    _CORPUS, _FOLDS, _STOPPING = corpus, folds, stopping
+    # Each trial process gets its own slice of the cores; together they fill the machine
+    torch.set_num_threads(threads)
+
+
+def _run_in_worker(task: dict) -> dict:
+    return run_trial(task, _CORPUS, _FOLDS, _STOPPING)
+
+
+def resolve_layout(n_tasks: int, workers: int = None, threads_per_worker: int = None) -> Tuple[int, int]:
+    """(workers, threads_per_worker); by default ~4 intra-op threads per trial, as for inference lanes."""
+    budget = detect_cpu_budget()
+    workers = max(1, min(n_tasks, workers or default_layout(budget)[0]))
+    return workers, threads_per_worker or max(1, budget // workers)
+
+
+def _make_stopping(early_stopping: dict, reports, lock=None) -> Optional[MedianStopping]:
+    if not early_stopping.get("enabled", True):
+        return None
+    return MedianStopping(reports, lock, min_epochs=int(early_stopping.get("min_epochs", 1)),
+                          min_peers=int(early_stopping.get("min_peers", 3)))
+
+
+def run_sweep(tasks: List[dict], corpus: TokenizedCorpus, folds, workers: int = 1, threads_per_worker: int = 1,
+              early_stopping: Optional[dict] = None, on_result=None) -> Tuple[List[dict], float]:
+    """Run every task across `workers` spawn processes sharing one corpus; returns (results, wall seconds)."""
+    early_stopping = early_stopping or {}
+    start = time.perf_counter()
+    results = []
+    if workers <= 1:
+        torch.set_num_threads(threads_per_worker)
+        stopping = _make_stopping(early_stopping, [])
+        for task in tasks:
+            results.append(run_trial(task, corpus, folds, stopping))
+            if on_result:
+                on_result(results[-1])
+        return results, time.perf_counter() - start
+
+    # spawn, not fork: forking after the parent has touched OpenMP is unsafe
+    ctx = mp.get_context("spawn")
+    # Early-stopping reports live in a manager process so every trial sees its peers' progress
+    with ctx.Manager() as manager:
+        stopping = _make_stopping(early_stopping, manager.list(), manager.Lock())
+        corpus.share_memory()
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=(corpus, folds, stopping, threads_per_worker)) as pool:
+            for result in pool.imap_unordered(_run_in_worker, tasks):
+                results.append(result)
+                if on_result:
+                    on_result(result)
+    return results, time.perf_counter() - start
+
+
+def summarize_trials(results: List[dict]) -> List[dict]:
+    """One row per hyperparameter set: F1 mean/std over folds, best first; pruned trials rank after completed."""
+    by_trial: Dict[int, List[dict]] = {}
+    for result in results:
+        by_trial.setdefault(result["trial"], []).append(result)
+
+    rows = []
+    for trial, runs in by_trial.items():
+        scores = [r["best_f1"] for r in runs]
+        rows.append({
+            "trial": trial,
+            **runs[0]["params"],
+            "folds": len(runs),
+            "mean_f1": float(np.mean(scores)),
+            "std_f1": float(np.std(scores)),
+            "status": "pruned" if any(r["status"] == "pruned" for r in runs) else "completed",
+            "epochs_run": sum(r["epochs_run"] for r in runs),
+            "seconds": sum(r["seconds"] for r in runs),
+        })
+    rows.sort(key=lambda r: (r["status"] != "completed", -r["mean_f1"]))
+    return rows
@@ -0,0 +1,164 @@
+# src/services/telemetry.py
+import csv
+import json
+import os
+import time
+from typing import List, Optional
+
+import torch
+
+from src.utils.memory import current_rss_mb
+
+PHASES = ("data", "tokenize", "forward", "backward", "optimizer", "other")
+FIELDS = ["time", "epoch", "step", "batch_size", "tokens", "padded_tokens", "padding_ratio"] + \
+         [f"{phase}_ms" for phase in PHASES] + \
+         ["step_ms", "samples_per_sec", "tokens_per_sec", "lr", "grad_norm", "loss", "rss_mb", "loader_tokenize_ms"]
+
+# What to look at when a phase dominates step time
+_HINTS = {
+    "data": "input pipeline: raise DataLoader num_workers / prefetch_factor",
+    "tokenize": "tokenization in the training process: warm the tokenizer cache or move it to loader workers",
+    "forward": "compute: cut padding (padding ratio) or max_len, check intra-op threads",
+    "backward": "compute: cut padding or max_len; with gradient_checkpointing on, backward also re-runs forward",
+    "optimizer": "optimizer step: fused/foreach AdamW, fewer trainable parameters",
+    "other": "per-step overhead: metric accumulation, checkpoint writes, logging",
+}
+
+
+class PhaseTimer:
+    """Lap timer for one training step; CUDA is synchronized only when `sync` is set (sampled steps)."""
+
+    def __init__(self):
+        self.sync = False
+        self.phases = {}
+        self._last = time.perf_counter()
+
+    def reset(self):
+        self.phases = {}
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        if self.sync:
+            torch.cuda.synchronize()
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+
+def grad_norm(parameters) -> float:
+    """Global L2 norm of the current gradients (same quantity clip_grad_norm_ reports)."""
+    norms = [p.grad.detach().norm(2) for p in parameters if p.grad is not None]
+    return float(torch.norm(torch.stack(norms), 2)) if norms else 0.0
+
+
+class StepTelemetry:
+    def __init__(self, path: str, every: int = 10, enabled: bool = True):
+        """
+        Per-step training telemetry written as JSONL (or CSV when path ends in .csv). Phase timing runs
+        on every step (a few perf_counter calls); only every `every`-th step pays for a record, a gradient
+        norm, an RSS read and, on CUDA, the synchronization needed for honest phase times.
+        """
+        self.path = path
+        self.every = max(1, int(every))
+        self.enabled = enabled
+        self.format = "csv" if path.endswith(".csv") else "jsonl"
+        self._file = None
+        self._writer = None
+
+    def should_record(self, step: int) -> bool:
+        return self.enabled and step % self.every == 0
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Append: a resumed run continues the same stream
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", encoding="utf-8", newline="")
+        if self.format == "csv":
+            self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+            if new_file:
+                self._writer.writeheader()
+
+    def record(self, epoch: int, step: int, phases: dict, batch_size: int, tokens: int, padded_tokens: int,
+               lr: float, grad_norm_value: Optional[float], loss: float, world_size: int = 1,
+               loader_tokenize_seconds: Optional[float] = None):
+        """
+        `phases` partition the step (the tokenize phase is in-process tokenization only).
+        loader_tokenize_seconds is encode time spent in a DataLoader worker for this batch: it overlaps
+        earlier steps, so it is kept out of the phases and out of step_ms.
+        """
+        if self._file is None:
+            self._open()
+        step_seconds = sum(phases.values())
+        entry = {
+            "time": time.time(),
+            "epoch": epoch,
+            "step": step,
+            "batch_size": batch_size,
+            "tokens": tokens,
+            "padded_tokens": padded_tokens,
+            "padding_ratio": 1 - tokens / padded_tokens if padded_tokens else 0.0,
+            **{f"{phase}_ms": phases.get(phase, 0.0) * 1000 for phase in PHASES},
+            "step_ms": step_seconds * 1000,
+            # Ranks step in lockstep, so global throughput is this rank's rate times the world size
+            "samples_per_sec": batch_size * world_size / step_seconds if step_seconds else 0.0,
+            "tokens_per_sec": tokens * world_size / step_seconds if step_seconds else 0.0,
+            "lr": lr,
+            "grad_norm": grad_norm_value,
+            "loss": loss,
+            "rss_mb": current_rss_mb(),
+            "loader_tokenize_ms": loader_tokenize_seconds * 1000 if loader_tokenize_seconds is not None else None,
+        }
+        if self._writer is not None:
+            self._writer.writerow(entry)
+        else:
+            self._file.write(json.dumps(entry) + "\n")
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._writer = None
+
+
+def load_records(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            return [{k: float(v) if v not in ("", None) else None for k, v in row.items()} for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _median(values):
+    values = sorted(v for v in values if v is not None)
+    return values[len(values) // 2] if values else 0.0
+
+
+def summarize(records: List[dict], skip_first: int = 1) -> dict:
+    """
+    Phase shares of total step time and the dominant one. The first `skip_first` records are skipped:
+    the first steps include allocator and thread-pool warmup and would skew the shares.
+    """
+    records = records[skip_first:] if len(records) > skip_first else records
+    if not records:
+        return {}
+    total_ms = sum(r["step_ms"] for r in records) or 1.0
+    shares = {phase: sum(r[f"{phase}_ms"] for r in records) / total_ms for phase in PHASES}
+    bottleneck = max(shares, key=shares.get)
+    return {
+        "records": len(records),
+        "steps": [int(records[0]["step"]), int(records[-1]["step"])],
+        "phase_share": shares,
+        "bottleneck": bottleneck,
+        "hint": _HINTS[bottleneck],
+        "median_step_ms": _median(r["step_ms"] for r in records),
+        "median_samples_per_sec": _median(r["samples_per_sec"] for r in records),
+        "median_tokens_per_sec": _median(r["tokens_per_sec"] for r in records),
+        "mean_padding_ratio": sum(r["padding_ratio"] for r in records) / len(records),
+        "rss_mb_first_last_max": [records[0]["rss_mb"], records[-1]["rss_mb"], max(r["rss_mb"] for r in records)],
+        "median_grad_norm": _median(r["grad_norm"] for r in records),
+        "lr_first_last": [records[0]["lr"], records[-1]["lr"]],
+        # Records written before the field existed simply have no loader tokenize time
+        "median_loader_tokenize_ms": _median(r.get("loader_tokenize_ms") for r in records),
+    }
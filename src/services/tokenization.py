@@ -0,0 +1,134 @@
+# src/services/tokenization.py
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+import numpy as np
+import torch
+from transformers import PreTrainedTokenizerBase
+
+# Same pre-split PhoBERT's slow BPE tokenizer applies before BPE: whitespace-separated words, trailing newline kept
+_WORD_RE = re.compile(r"\S+\n?")
+
+
+class CachedTokenizer:
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, cache_size: int = 100_000):
+        """
+        Memoized front end for a slow (Python) tokenizer that splits text on whitespace before subword BPE.
+        Word -> subword-id results live in a bounded LRU cache; each text is then truncated, wrapped in
+        special tokens and padded straight into preallocated arrays, skipping encode_plus entirely.
+        Output is identical to tokenizer(text, max_length=..., padding='max_length', truncation=True).
+
+        Texts containing special/added token strings take the reference path (those are split out before
+        BPE), and fast (Rust) tokenizers are delegated to as-is.
+        """
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self.pad_token_id = tokenizer.pad_token_id
+        self.padding_side = tokenizer.padding_side
+        self.memoized = (not getattr(tokenizer, "is_fast", False)
+                         and getattr(tokenizer, "truncation_side", "right") == "right")
+
+        # Special-token layout comes from the tokenizer itself: whatever surrounds a sentinel id
+        template = tokenizer.build_inputs_with_special_tokens([-1])
+        cut = template.index(-1)
+        self._prefix, self._suffix = template[:cut], template[cut + 1:]
+        self._n_special = len(template) - 1
+        self._special_strings = [t for t in set(tokenizer.all_special_tokens) | set(tokenizer.get_added_vocab()) if t]
+
+        self._encode_word = lru_cache(maxsize=cache_size)(self._encode_word_uncached)
+        # Cumulative encode_batch time in this process; training telemetry reports it per step
+        self.encode_seconds = 0.0
+
+    def __getstate__(self):
+        # DataLoader workers under spawn pickle the dataset; the cache wrapper is rebuilt on the other side
+        state = self.__dict__.copy()
+        del state["_encode_word"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._encode_word = lru_cache(maxsize=self.cache_size)(self._encode_word_uncached)
+
+    def _encode_word_uncached(self, word: str) -> tuple:
+        return tuple(self.tokenizer.encode(word, add_special_tokens=False))
+
+    def _needs_reference(self, text: str) -> bool:
+        return any(token in text for token in self._special_strings)
+
+    def _content_ids(self, text: str, limit: int) -> List[int]:
+        ids = []
+        for word in _WORD_RE.findall(text):
+            ids.extend(self._encode_word(word))
+            # Truncation keeps the head, so words past the limit are never looked up
+            if len(ids) >= limit:
+                break
+        return ids[:limit]
+
+    def encode_batch(self, texts: Sequence[str], max_length: int, return_tensors: str = "pt") -> Dict:
+        """input_ids/attention_mask of shape (len(texts), max_length) as torch tensors ("pt") or numpy arrays ("np")."""
+        start = time.perf_counter()
+        try:
+            return self._encode_batch(texts, max_length, return_tensors)
+        finally:
+            self.encode_seconds += time.perf_counter() - start
+
+    def _encode_batch(self, texts: Sequence[str], max_length: int, return_tensors: str) -> Dict:
+        if not self.memoized:
+            return dict(self.tokenizer(list(texts), max_length=max_length, padding='max_length',
+                                       truncation=True, return_tensors=return_tensors))
+
+        input_ids = np.full((len(texts), max_length), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(texts), max_length), dtype=np.int64)
+        limit = max(0, max_length - self._n_special)
+
+        for row, text in enumerate(texts):
+            if self._needs_reference(text):
+                encoding = self.tokenizer(text, max_length=max_length, padding='max_length', truncation=True)
+                input_ids[row] = encoding['input_ids']
+                attention_mask[row] = encoding['attention_mask']
+                continue
+
+            ids = self._prefix + self._content_ids(text, limit) + self._suffix
+            span = slice(0, len(ids)) if self.padding_side == "right" else slice(max_length - len(ids), max_length)
+            input_ids[row, span] = ids
+            attention_mask[row, span] = 1
+
+        if return_tensors == "pt":
+            # Zero-copy: the tensors share the numpy buffers
+            return {'input_ids': torch.from_numpy(input_ids), 'attention_mask': torch.from_numpy(attention_mask)}
+        return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+    @property
+    def can_shorten(self) -> bool:
+        return self.padding_side == "right" and getattr(self.tokenizer, "truncation_side", "right") == "right"
+
+    def shorten(self, encoding: Dict, max_length: int) -> Dict:
+        """
+        Cut a torch encode_batch result down to a smaller max_length without re-tokenizing. Rows that no
+        longer fit get the closing special tokens written back at the new end, which makes the result
+        identical to encode_batch(texts, max_length). Needs right padding and right truncation.
+        """
+        if not self.can_shorten:
+            raise ValueError("shorten() cần padding và truncation bên phải")
+        input_ids = encoding['input_ids'][:, :max_length].clone()
+        attention_mask = encoding['attention_mask'][:, :max_length].clone()
+        if self._suffix:
+            overflow = encoding['attention_mask'].sum(dim=1) > max_length
+            input_ids[overflow, max_length - len(self._suffix):] = torch.tensor(self._suffix, dtype=input_ids.dtype)
+        return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+    def cache_stats(self) -> dict:
+        info = self._encode_word.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+            "size": info.currsize,
+            "max_size": info.maxsize,
+        }
+
+    def clear_cache(self):
+        self._encode_word.cache_clear()
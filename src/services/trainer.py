@@ -1,5 +1,9 @@
+import time
+
 import torch
+import torch.distributed as dist
 import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
 from torch.utils.data import DataLoader
 from torch.optim import AdamW
 from transformers import get_linear_schedule_with_warmup
@@ -7,12 +11,27 @@ from sklearn.metrics import accuracy_score, f1_score
 from tqdm import tqdm
 import numpy as np
 
+from src.utils.memory import peak_rss_mb, reset_peak_rss
+from src.services.distributed import (
+    all_gather_arrays, all_reduce_sum, get_rank, get_world_size, is_distributed, is_main_process
+)
+from src.services.checkpointing import CheckpointManager, capture_rng_state, restore_rng_state
+from src.services.telemetry import PhaseTimer, StepTelemetry, grad_norm
+
 
 class HateSpeechTrainer:
-    def __init__(self, model, train_loader: DataLoader, val_loader: DataLoader, device: str, lr: float = 2e-5):
+    def __init__(self, model, train_loader: DataLoader, val_loader: DataLoader, device: str, lr: float = 2e-5,
+                 num_training_steps: int = None, warmup_ratio: float = 0.0,
+                 checkpoint_manager: CheckpointManager = None, checkpoint_every: int = None,
+                 telemetry: StepTelemetry = None):
         """
         Trainer owns optimization lifecycle for supervised classification.
         Assumes model emits logits per class and DataLoaders yield dict batches with input_ids, attention_mask, labels.
+        When a torch.distributed process group is active the model is wrapped in DistributedDataParallel;
+        loaders are then expected to shard data per rank (DistributedSampler / EvalShardSampler).
+        With a checkpoint_manager, full training state is checkpointed every checkpoint_every optimizer steps;
+        exact mid-epoch resume additionally needs a ResumableSampler on the train loader.
+        With telemetry, sampled steps are recorded with per-phase timings, throughput, LR and grad norm.
         """
         self.model = model
         self.train_loader = train_loader
@@ -20,29 +39,116 @@ class HateSpeechTrainer:
         self.device = torch.device(device)
         self.model.to(self.device)
 
+        # Gradients are all-reduced during backward; CPU/gloo needs no device_ids
+        if is_distributed():
+            device_ids = [self.device.index] if self.device.type == 'cuda' else None
+            self.model = DistributedDataParallel(self.model, device_ids=device_ids)
+
         # Cross-entropy aligns with multi-class logits; label IDs must be contiguous starting at 0
         self.criterion = nn.CrossEntropyLoss()
 
-        # AdamW is standard for Transformer fine-tuning; weight decay handled internally
-        self.optimizer = AdamW(self.model.parameters(), lr=lr)
+        # AdamW is standard for Transformer fine-tuning; weight decay handled internally.
+        # Frozen parameters (e.g. the backbone under EarlyExitClassifier) carry no optimizer state
+        self.optimizer = AdamW([p for p in self.model.parameters() if p.requires_grad], lr=lr)
+
+        # Linear decay with warmup is opt-in; without num_training_steps the learning rate stays constant
+        self.scheduler = None
+        if num_training_steps:
+            self.scheduler = get_linear_schedule_with_warmup(
+                self.optimizer,
+                num_warmup_steps=int(num_training_steps * warmup_ratio),
+                num_training_steps=num_training_steps
+            )
+
+        self.checkpoint_manager = checkpoint_manager
+        self.checkpoint_every = checkpoint_every
+        self.global_step = 0
+        # Set by resume(); consumed by the first train_one_epoch call of the resumed epoch
+        self._resume_progress = None
+
+        # Per-epoch peak resident memory and global throughput, for capacity planning across node sizes
+        self.epoch_stats = []
+        self.telemetry = telemetry
+
+    @property
+    def base_model(self):
+        """The underlying classifier, unwrapped from DDP when distributed."""
+        return self.model.module if isinstance(self.model, DistributedDataParallel) else self.model
+
+    def _loss(self, outputs, labels):
+        # Models with several outputs per sample (early-exit heads) define their own loss
+        loss_fn = getattr(self.base_model, 'loss', None)
+        return loss_fn(outputs, labels) if loss_fn is not None else self.criterion(outputs, labels)
+
+    def _metric_logits(self, outputs):
+        metric_fn = getattr(self.base_model, 'metric_logits', None)
+        return metric_fn(outputs) if metric_fn is not None else outputs
 
     def compute_metrics(self, preds, labels):
-        """Return accuracy and macro-F1; macro treats classes equally, useful under imbalance."""
+        """
+        Return accuracy and macro-F1; macro treats classes equally, useful under imbalance.
+        Under distributed training each rank passes its shard; predictions are gathered so every rank
+        reports metrics over the full split rather than a per-rank approximation.
+        """
+        preds = all_gather_arrays(preds)
+        labels = all_gather_arrays(labels)
         preds = np.argmax(preds, axis=1)
         acc = accuracy_score(labels, preds)
         f1 = f1_score(labels, preds, average='macro')
         return acc, f1
 
-    def train_one_epoch(self, epoch_index):
+    def train_one_epoch(self, epoch_index, max_steps: int = None):
         # Training mode enables stochastic layers; evaluation uses a separate pass
         self.model.train()
-        total_loss = 0
-        all_preds = []
-        all_labels = []
+        # Epoch accumulators live in one dict so a checkpoint can carry a partially finished epoch
+        progress = {'total_loss': 0.0, 'num_steps': 0, 'samples_seen': 0, 'preds': [], 'labels': []}
+
+        # DistributedSampler derives its shuffle from the epoch; without this every epoch repeats one order.
+        # Batch-level loaders pass a BatchSampler as the sampler; epoch and skip live on the one it wraps
+        sampler = getattr(self.train_loader, 'sampler', None)
+        sampler = getattr(sampler, 'sampler', sampler)
+        if hasattr(sampler, 'set_epoch'):
+            sampler.set_epoch(epoch_index)
+
+        resume_rng = None
+        if self._resume_progress is not None and self._resume_progress['epoch'] == epoch_index:
+            saved = self._resume_progress
+            self._resume_progress = None
+            progress.update(saved['progress'])
+            resume_rng = saved['rng']
+            # Fast-forward past the samples the interrupted run already trained on
+            if hasattr(sampler, 'skip'):
+                sampler.skip(progress['samples_seen'])
+
+        # Scope the RSS high-water mark to this epoch (Linux); elsewhere it remains the process peak
+        reset_peak_rss()
+        num_samples = 0
+        num_steps = 0
+        start_time = time.perf_counter()
+
+        # Creating the iterator draws the loader's base seed from the global RNG, so saved RNG state
+        # is restored only afterwards to replay the interrupted run draw-for-draw
+        batches = iter(self.train_loader)
+        if resume_rng is not None:
+            restore_rng_state(resume_rng)
+
+        progress_bar = tqdm(batches, total=len(self.train_loader), desc=f"Training Epoch {epoch_index}",
+                            disable=not is_main_process())
 
-        progress_bar = tqdm(self.train_loader, desc=f"Training Epoch {epoch_index}")
+        # Tokenization runs inside __getitem__; in-process its time is split out of data loading. Batches
+        # built by loader workers carry their own encode time, which overlaps the step and is recorded apart
+        tokenizer = getattr(getattr(self.train_loader, 'dataset', None), 'tokenizer', None)
+        timer = PhaseTimer()
+        tokenize_mark = getattr(tokenizer, 'encode_seconds', 0.0)
 
         for batch in progress_bar:
+            recording = self.telemetry is not None and self.telemetry.should_record(self.global_step + 1)
+            timer.sync = recording and self.device.type == 'cuda'
+            timer.lap('data')
+            if tokenizer is not None:
+                timer.phases['tokenize'] = tokenizer.encode_seconds - tokenize_mark
+                timer.phases['data'] -= timer.phases['tokenize']
+
             # Batches must fit in device memory; failing here indicates batch size misconfiguration
             input_ids = batch['input_ids'].to(self.device)
             attention_mask = batch['attention_mask'].to(self.device)
@@ -52,53 +158,178 @@ class HateSpeechTrainer:
 
             outputs = self.model(input_ids, attention_mask)
 
-            loss = self.criterion(outputs, labels)
-            total_loss += loss.item()
+            loss = self._loss(outputs, labels)
+            timer.lap('forward')
 
             loss.backward()
+            timer.lap('backward')
+
+            # LR this step was taken with; the scheduler moves it on for the next one
+            lr = self.optimizer.param_groups[0]['lr']
             self.optimizer.step()
+            if self.scheduler is not None:
+                self.scheduler.step()
+            timer.lap('optimizer')
+
+            loss_value = loss.item()
+            progress['total_loss'] += loss_value
 
             # Accumulate for epoch-level metrics; detach to avoid graph retention
-            all_preds.append(outputs.detach().cpu().numpy())
-            all_labels.append(labels.detach().cpu().numpy())
+            progress['preds'].append(self._metric_logits(outputs).detach().cpu().numpy())
+            progress['labels'].append(labels.detach().cpu().numpy())
+
+            progress_bar.set_postfix({'loss': loss_value})
+            progress['num_steps'] += 1
+            progress['samples_seen'] += labels.size(0)
+            num_samples += labels.size(0)
+            num_steps += 1
+            self.global_step += 1
+
+            if self.checkpoint_every and self.global_step % self.checkpoint_every == 0:
+                self.save_checkpoint(epoch_index, progress)
+            timer.lap('other')
 
-            progress_bar.set_postfix({'loss': loss.item()})
+            if recording:
+                # Gradients are still intact here: they are only zeroed at the start of the next step
+                self.telemetry.record(
+                    epoch=epoch_index, step=self.global_step, phases=timer.phases,
+                    batch_size=labels.size(0), tokens=int(attention_mask.sum()),
+                    padded_tokens=attention_mask.numel(), lr=lr,
+                    grad_norm_value=grad_norm(self.model.parameters()), loss=loss_value,
+                    world_size=get_world_size(),
+                    loader_tokenize_seconds=0.0 if timer.phases.get('tokenize') else batch.get('tokenize_seconds'),
+                )
+            # Telemetry writes are excluded from every phase of the next step
+            timer.reset()
+            tokenize_mark = getattr(tokenizer, 'encode_seconds', 0.0)
 
-        avg_loss = total_loss / len(self.train_loader)
-        all_preds = np.concatenate(all_preds, axis=0)
-        all_labels = np.concatenate(all_labels, axis=0)
+            if max_steps is not None and num_steps >= max_steps:
+                break
+
+        if self.telemetry is not None:
+            self.telemetry.flush()
+
+        elapsed = time.perf_counter() - start_time
+
+        # Loss is averaged over all batches of all ranks, matching the single-process definition
+        avg_loss = all_reduce_sum(progress['total_loss']) / max(all_reduce_sum(progress['num_steps']), 1)
+        all_preds = np.concatenate(progress['preds'], axis=0)
+        all_labels = np.concatenate(progress['labels'], axis=0)
         acc, f1 = self.compute_metrics(all_preds, all_labels)
 
+        # Ranks run in lockstep, so global throughput is total samples over the slowest rank's time
+        global_samples = all_reduce_sum(num_samples)
+        samples_per_sec = global_samples / elapsed if elapsed > 0 else 0.0
+        peak_mb = peak_rss_mb()
+        self.epoch_stats.append({
+            'epoch': epoch_index,
+            'peak_rss_mb': peak_mb,
+            'samples': int(global_samples),
+            'seconds': elapsed,
+            'samples_per_sec': samples_per_sec,
+            'world_size': get_world_size(),
+        })
+        print(f"--> Peak RSS epoch {epoch_index}: {peak_mb:.0f} MB | {samples_per_sec:.1f} samples/s")
+
         return avg_loss, acc, f1
 
     def evaluate(self):
         # Inference-only path; gradients and stochastic layers must be disabled for stable metrics
-        self.model.eval()
+        # The unwrapped model is used so uneven evaluation shards never wait on DDP collectives
+        model = self.base_model
+        model.eval()
         total_loss = 0
         all_preds = []
         all_labels = []
 
         with torch.no_grad():
-            for batch in tqdm(self.val_loader, desc="Evaluating"):
+            for batch in tqdm(self.val_loader, desc="Evaluating", disable=not is_main_process()):
                 input_ids = batch['input_ids'].to(self.device)
                 attention_mask = batch['attention_mask'].to(self.device)
                 labels = batch['labels'].to(self.device)
 
-                outputs = self.model(input_ids, attention_mask)
-                loss = self.criterion(outputs, labels)
+                outputs = model(input_ids, attention_mask)
+                loss = self._loss(outputs, labels)
                 total_loss += loss.item()
 
-                all_preds.append(outputs.detach().cpu().numpy())
+                all_preds.append(self._metric_logits(outputs).detach().cpu().numpy())
                 all_labels.append(labels.detach().cpu().numpy())
 
-        avg_loss = total_loss / len(self.val_loader)
-        all_preds = np.concatenate(all_preds, axis=0)
-        all_labels = np.concatenate(all_labels, axis=0)
+        avg_loss = all_reduce_sum(total_loss) / max(all_reduce_sum(len(self.val_loader)), 1)
+        # A rank can receive an empty shard when the split is smaller than the world size
+        all_preds = np.concatenate(all_preds, axis=0) if all_preds else np.empty((0, 0), dtype=np.float32)
+        all_labels = np.concatenate(all_labels, axis=0) if all_labels else np.empty((0,), dtype=np.int64)
         acc, f1 = self.compute_metrics(all_preds, all_labels)
 
         return avg_loss, acc, f1
 
+    def save_checkpoint(self, epoch_index: int, progress: dict = None):
+        """
+        Queue a full-state checkpoint. progress=None marks epoch_index as finished, so resume starts
+        the next epoch; otherwise the partial-epoch accumulators and sampler position are stored.
+        Collective under DDP (every rank contributes its RNG state); only rank 0 writes.
+        """
+        if self.checkpoint_manager is None:
+            return
+
+        # Dropout masks and epoch shards differ per rank, so every rank's RNG stream and partial-epoch
+        # accumulators are kept for an exact restart
+        local = {'rng': capture_rng_state(), 'progress': progress}
+        if is_distributed():
+            per_rank = [None] * get_world_size()
+            dist.all_gather_object(per_rank, local)
+        else:
+            per_rank = [local]
+
+        state = {
+            'model': self.base_model.state_dict(),
+            'optimizer': self.optimizer.state_dict(),
+            'scheduler': self.scheduler.state_dict() if self.scheduler is not None else None,
+            'global_step': self.global_step,
+            'epoch': epoch_index,
+            'epoch_complete': progress is None,
+            'per_rank': per_rank,
+            'world_size': get_world_size(),
+            'epoch_stats': self.epoch_stats,
+        }
+        self.checkpoint_manager.save(state, self.global_step)
+
+    def resume(self, path: str) -> int:
+        """Load a full-state checkpoint and return the epoch number training should continue from."""
+        state = torch.load(path, map_location=self.device, weights_only=False)
+
+        self.base_model.load_state_dict(state['model'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        if self.scheduler is not None and state['scheduler'] is not None:
+            self.scheduler.load_state_dict(state['scheduler'])
+        self.global_step = state['global_step']
+        self.epoch_stats = state['epoch_stats']
+
+        # RNG streams and shards are per rank; a different world size cannot replay the same trajectory
+        if state['world_size'] != get_world_size():
+            raise RuntimeError(
+                f"Checkpoint được tạo với world_size={state['world_size']}, hiện tại là {get_world_size()}"
+            )
+        local = state['per_rank'][get_rank()]
+        rng = local['rng']
+
+        print(f"--> Tiếp tục từ checkpoint: {path} (step {self.global_step}, epoch {state['epoch']})")
+        if state['epoch_complete']:
+            restore_rng_state(rng)
+            return state['epoch'] + 1
+
+        self._resume_progress = {'epoch': state['epoch'], 'progress': local['progress'], 'rng': rng}
+        return state['epoch']
+
     def save_model(self, path: str):
+        # Ranks hold identical weights after each step; only rank 0 writes to avoid clobbering the file
+        if not is_main_process():
+            return
         # Persisting state_dict enables later rehydration for inference/API without full training context
-        torch.save(self.model.state_dict(), path)
+        # Saved from the unwrapped model so keys carry no "module." prefix and load into HateSpeechClassifier
+        if self.checkpoint_manager is not None:
+            # Snapshot now, serialize on the writer thread so the next epoch starts immediately
+            self.checkpoint_manager.save_file(self.base_model.state_dict(), path)
+            return
+        torch.save(self.base_model.state_dict(), path)
         print(f"--> Đã lưu model tại: {path}")
\ No newline at end of file
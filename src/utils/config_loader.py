@@ -16,6 +16,16 @@ class Config:
         # Data section holds dataset paths and related settings; defaults to empty for robustness
         return self._cfg.get("data", {})
 
+    @property
+    def training(self):
+        # Training section holds batch/sequence sizing and memory options; callers apply their own defaults
+        return self._cfg.get("training") or {}
+
+    @property
+    def serving(self):
+        # Serving section holds model path and API runtime options; callers apply their own defaults
+        return self._cfg.get("serving") or {}
+
 
 # Provide a module-level config for convenience; downstream code should handle None defensively
 try:
@@ -0,0 +1,77 @@
+# src/utils/memory.py
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module; peak tracking degrades to current RSS
+    resource = None
+
+_STATUS_PATH = "/proc/self/status"
+_CLEAR_REFS_PATH = "/proc/self/clear_refs"
+
+
+def _read_status_kb(field: str):
+    """Read a memory field (e.g. VmRSS, VmHWM) from /proc/self/status in kB; None when unavailable."""
+    try:
+        with open(_STATUS_PATH, "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process right now, in MB."""
+    kb = _read_status_kb("VmRSS")
+    if kb is not None:
+        return kb / 1024
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """
+    High-water mark of resident memory in MB. On Linux this honours reset_peak_rss();
+    elsewhere it is the lifetime peak reported by getrusage.
+    """
+    kb = _read_status_kb("VmHWM")
+    if kb is not None:
+        return kb / 1024
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS but kilobytes on Linux/BSD
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the peak RSS counter so the next peak_rss_mb() covers only the following window.
+    Returns False when the platform cannot reset it (peak stays process-lifetime).
+    """
+    try:
+        # "5" resets VmHWM to the current RSS (Linux >= 4.0)
+        with open(_CLEAR_REFS_PATH, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def available_memory_mb():
+    """Physical memory currently available to new allocations, in MB; None when unknown."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if hasattr(os, "sysconf"):
+        try:
+            return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (ValueError, OSError):
+            pass
+    return None
@@ -0,0 +1,44 @@
+import argparse
+import json
+
+from src.services.telemetry import PHASES, load_records, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tóm tắt telemetry huấn luyện và chỉ ra nút thắt chính")
+    parser.add_argument("path", nargs="?", default="models/telemetry.jsonl")
+    parser.add_argument("--skip-first", type=int, default=1, help="Bỏ N bản ghi đầu (warmup)")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    args = parser.parse_args()
+
+    summary = summarize(load_records(args.path), skip_first=args.skip_first)
+    if not summary:
+        print(f"❌ {args.path} chưa có bản ghi nào")
+        return
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"\n=== {summary['records']} bước được ghi (step {summary['steps'][0]} → {summary['steps'][1]}) ===")
+    print(f"Median: {summary['median_step_ms']:.0f} ms/step | {summary['median_samples_per_sec']:.1f} samples/s"
+          f" | {summary['median_tokens_per_sec']:.0f} tokens/s")
+    print(f"Padding: {summary['mean_padding_ratio']:.1%} token là padding")
+    first, last, peak = summary['rss_mb_first_last_max']
+    print(f"RSS: {first:.0f} → {last:.0f} MB (max {peak:.0f}) | grad norm median {summary['median_grad_norm']:.3f}"
+          f" | LR {summary['lr_first_last'][0]:.2e} → {summary['lr_first_last'][1]:.2e}")
+
+    print("\n--- TỈ TRỌNG THỜI GIAN MỖI PHA (tokenize: chỉ phần chạy trong tiến trình train) ---")
+    for phase in PHASES:
+        share = summary['phase_share'][phase]
+        print(f"{phase:<10} {share:>6.1%} {'#' * int(share * 40)}")
+    if summary.get('median_loader_tokenize_ms'):
+        # Worker-side encode time overlaps the step; it only stalls training once it shows up as 'data'
+        print(f"Tokenize trong loader worker: median {summary['median_loader_tokenize_ms']:.0f} ms/batch "
+              f"(song song với step, không tính vào các pha trên)")
+
+    print(f"\n⚠️ Nút thắt: {summary['bottleneck']} ({summary['phase_share'][summary['bottleneck']]:.0%})"
+          f" -> {summary['hint']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+
+import src.api.server as server
+
+
+def test_admin_routes_locked_without_token():
+    server.ADMIN_TOKEN = None
+    # TestClient's peer address is "testclient", i.e. not a loopback caller
+    client = TestClient(server.app)
+    for method, url in [("get", "/admin/model"), ("get", "/admin/fleet"), ("post", "/admin/rollback")]:
+        assert getattr(client, method)(url).status_code == 403
+    assert client.post("/admin/reload", json={"model_path": "models/x.pth"}).status_code == 403
+    print("✅ Không có admin token: route admin trả 403 cho client ngoài localhost")
+
+
+def test_admin_token_and_model_path_confinement():
+    server.ADMIN_TOKEN = "secret"
+    client = TestClient(server.app)
+    assert client.get("/admin/model", headers={"X-Admin-Token": "sai"}).status_code == 403
+
+    headers = {"X-Admin-Token": "secret"}
+    for bad in ["/etc/passwd", "../requirements.txt", "models/../config.yaml"]:
+        response = client.post("/admin/reload", json={"model_path": bad}, headers=headers)
+        assert response.status_code == 400, (bad, response.status_code)
+    # A path inside models/ passes validation and only then hits the readiness check (no model loaded here)
+    assert client.post("/admin/reload", json={"model_path": "models/x.pth"}, headers=headers).status_code == 409
+    server.ADMIN_TOKEN = None
+    print("✅ Admin token bắt buộc khi được cấu hình; model_path ngoài models/ bị từ chối")
+
+
+if __name__ == "__main__":
+    test_admin_routes_locked_without_token()
+    test_admin_token_and_model_path_confinement()
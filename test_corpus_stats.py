@@ -0,0 +1,54 @@
+import os
+import tempfile
+from collections import Counter
+
+from src.data_layer.data_loader import DataLoader
+from src.services.corpus_stats import CorpusStats
+from src.services.preprocessing.pipeline import PreprocessingPipeline
+
+
+def training_labels(path):
+    return Counter(s.label for s in PreprocessingPipeline().run(DataLoader().load_data(path)))
+
+
+def write_csv(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def test_sentence_format_labels_match_training():
+    # Raw label values as they appear in sentence-level sources: tag strings and plain numbers
+    content = ("sentence,label\n"
+               "mày ngu quá,B-T\n"
+               "hôm nay trời đẹp,O\n"
+               "đồ khốn nạn,\"['O', 'I-T']\"\n"
+               "cảm ơn bạn,1\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_csv(tmp, "sentences.csv", content)
+        stats = CorpusStats()
+        stats.update(path)
+        labels = stats.summary()["labels"]
+        assert labels == dict(training_labels(path)), (labels, training_labels(path))
+    print(f"✅ Nhãn dạng câu khớp với pipeline huấn luyện: {labels}")
+
+
+def test_sequence_format_labels_match_training():
+    content = ("sentence_id,Word,Tag\n"
+               "1,mày,B-T\n1,ngu,I-T\n"
+               "2,trời,O\n2,đẹp,O\n"
+               "3,đồ,O\n3,khốn,B-T\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_csv(tmp, "sequence.csv", content)
+        stats = CorpusStats()
+        stats.update(path)
+        # The last sentence is still pending in the state; summary() counts it, as training would
+        labels = stats.summary()["labels"]
+        assert labels == dict(training_labels(path)), (labels, training_labels(path))
+    print(f"✅ Nhãn dạng sequence khớp với pipeline huấn luyện: {labels}")
+
+
+if __name__ == "__main__":
+    test_sentence_format_labels_match_training()
+    test_sequence_format_labels_match_training()
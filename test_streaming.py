@@ -0,0 +1,69 @@
+import asyncio
+import json
+from concurrent.futures import Future
+
+from src.api.streaming import stream_predictions
+
+
+class FakeRequest:
+    """Request body delivered in arbitrary chunks, like a client streaming NDJSON."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+class FakePredictor:
+    def predict_batch(self, texts):
+        return [{"label": "CLEAN", "confidence": "99.00%", "text_clean": t.lower()} for t in texts]
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class FakeManager:
+    predictor = FakePredictor()
+    executor = InlineExecutor()
+
+
+async def collect(body: bytes, **kwargs):
+    out = b""
+    async for part in stream_predictions(FakeRequest([body]), FakeManager(), batch_size=2, linger_ms=1, **kwargs):
+        out += part
+    return [json.loads(line) for line in out.decode("utf-8").splitlines()]
+
+
+def test_non_object_lines_get_error_verdicts():
+    lines = ['{"text": "Xin chào", "id": 1}', '"abc"', '[1, 2]', '42', 'null', '{"text": "Tạm biệt", "id": 2}']
+    verdicts = asyncio.run(collect(("\n".join(lines) + "\n").encode("utf-8")))
+
+    # Every line gets a verdict, in order, and the stream continues past the malformed ones
+    assert [v["line"] for v in verdicts] == [1, 2, 3, 4, 5, 6]
+    assert verdicts[0]["label"] == "CLEAN" and verdicts[0]["id"] == 1
+    assert all("error" in v for v in verdicts[1:5])
+    assert verdicts[5]["label"] == "CLEAN" and verdicts[5]["id"] == 2
+    print("✅ Dòng JSON không phải object nhận verdict lỗi, stream vẫn tiếp tục")
+
+
+def test_oversized_line_in_one_chunk_is_rejected():
+    long_line = json.dumps({"text": "a " * 100, "id": 2})
+    lines = ['{"text": "ngắn", "id": 1}', long_line, '{"text": "ngắn nữa", "id": 3}']
+    # The whole body, newline included, arrives as a single chunk
+    verdicts = asyncio.run(collect(("\n".join(lines) + "\n").encode("utf-8"), max_line_bytes=64))
+
+    assert [v["line"] for v in verdicts] == [1, 2, 3]
+    assert verdicts[1]["error"] == "Dòng vượt quá 64 byte" and "label" not in verdicts[1]
+    assert verdicts[0]["label"] == "CLEAN" and verdicts[2]["label"] == "CLEAN"
+    print("✅ Dòng quá dài nằm trọn trong một chunk vẫn bị từ chối")
+
+
+if __name__ == "__main__":
+    test_non_object_lines_get_error_verdicts()
+    test_oversized_line_in_one_chunk_is_rejected()
@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+
+import torch
+import torch.multiprocessing as mp
+from transformers import AutoTokenizer
+
+from src.utils.config_loader import config
+from src.data_layer.data_loader import DataLoader as MyDataLoader
+from src.data_layer.dedup import split_corpus
+from src.services.preprocessing.pipeline import PreprocessingPipeline
+from src.core.dataset import HateSpeechDataset, build_data_loader
+from src.services.tokenization import CachedTokenizer
+from src.models.phobert_classifier import HateSpeechClassifier
+from src.services.trainer import HateSpeechTrainer
+from src.services.checkpointing import CheckpointManager, ResumableSampler
+from src.services.telemetry import StepTelemetry
+from src.services.distributed import (
+    EvalShardSampler, cleanup_distributed, find_free_port, init_distributed, is_main_process
+)
+
+
+# Steps per epoch for the baseline when --benchmark-steps is not given
+DEFAULT_BASELINE_STEPS = 50
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Huấn luyện data-parallel trên CPU (torch.distributed + gloo)")
+    parser.add_argument("--nproc", type=int, default=2, help="Số tiến trình worker trên node này")
+    parser.add_argument("--nnodes", type=int, default=1)
+    parser.add_argument("--node-rank", type=int, default=0)
+    parser.add_argument("--master-addr", default="127.0.0.1")
+    parser.add_argument("--master-port", type=int, default=None,
+                        help="Bắt buộc khi nnodes > 1; mặc định chọn cổng trống trên localhost")
+    parser.add_argument("--threads-per-proc", type=int, default=None,
+                        help="Số intra-op thread mỗi tiến trình; mặc định chia đều số core")
+    parser.add_argument("--epochs", type=int, default=None)
+    parser.add_argument("--benchmark-steps", type=int, default=None,
+                        help="Chỉ chạy N bước/epoch để đo throughput, không lưu checkpoint")
+    parser.add_argument("--resume", nargs="?", const="latest", default=None,
+                        help="Tiếp tục từ checkpoint (cùng số tiến trình với lần chạy trước)")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Chạy thêm 1 tiến trình đơn dùng toàn bộ core làm mốc để tính speedup")
+    parser.add_argument("--slice-baseline", action="store_true",
+                        help="Cùng với --baseline: chạy thêm 1 tiến trình với số thread của 1 rank (per-slice efficiency)")
+    return parser.parse_args()
+
+
+def run_worker(local_rank, args, world_size, master_port, threads, result_queue):
+    rank = args.node_rank * args.nproc + local_rank if world_size > 1 else 0
+    # Each rank gets a slice of the cores; oversubscribing intra-op threads across ranks kills scaling
+    torch.set_num_threads(threads)
+    # A single-process run (the baseline) trains without a process group, i.e. exactly like main.py
+    if world_size > 1:
+        init_distributed(rank, world_size, master_addr=args.master_addr, master_port=master_port)
+
+    try:
+        train_cfg = config.training
+        batch_size = int(train_cfg.get('batch_size', 16))
+        max_len = int(train_cfg.get('max_len', 128))
+        epochs = args.epochs or int(train_cfg.get('epochs', 3))
+
+        # Every rank rebuilds the same split (fixed seed); samplers then shard it without communication
+        raw_data = MyDataLoader().load_data(config.data.get('train_path'))
+        clean_data = PreprocessingPipeline().run(raw_data)
+        train_data, val_data, dedup_report = split_corpus(clean_data, config.data.get('dedup'), test_size=0.2,
+                                                          random_state=42)
+        if dedup_report and is_main_process():
+            print(f"--> [Dedup] Bỏ {dedup_report['rows_removed']}/{dedup_report['rows_in']} dòng trùng gần đúng, "
+                  f"train bớt {dedup_report['train_rows_saved_per_epoch']} dòng/epoch")
+
+        tokenizer = CachedTokenizer(AutoTokenizer.from_pretrained("vinai/phobert-base-v2"))
+        train_dataset = HateSpeechDataset(train_data, tokenizer, max_len=max_len)
+        val_dataset = HateSpeechDataset(val_data, tokenizer, max_len=max_len)
+
+        # batch_size is per rank, so the global batch is batch_size * world_size
+        train_sampler = ResumableSampler(train_dataset, num_replicas=world_size, rank=rank, shuffle=True, seed=42)
+        val_sampler = EvalShardSampler(val_dataset, num_replicas=world_size, rank=rank)
+        # Loader workers share this rank's core slice; keep num_workers small per rank
+        loader_cfg = train_cfg.get('loader') or {}
+        loader_kwargs = dict(
+            num_workers=int(loader_cfg.get('num_workers', 0)),
+            prefetch_factor=int(loader_cfg.get('prefetch_factor', 2)),
+            persistent_workers=bool(loader_cfg.get('persistent_workers', True)),
+        )
+        train_loader = build_data_loader(train_dataset, train_sampler, batch_size, **loader_kwargs)
+        val_loader = build_data_loader(val_dataset, val_sampler, batch_size, **loader_kwargs)
+
+        # Identical init on every rank is guaranteed by DDP broadcasting rank 0's weights at wrap time
+        model = HateSpeechClassifier(
+            n_classes=2,
+            dropout=float(train_cfg.get('dropout', 0.3)),
+            gradient_checkpointing=bool(train_cfg.get('gradient_checkpointing', False))
+        )
+        # Benchmark runs must not leave checkpoints behind; only rank 0 writes when enabled
+        checkpoint_manager = None
+        if args.benchmark_steps is None:
+            checkpoint_manager = CheckpointManager(
+                train_cfg.get('checkpoint_dir', 'models/checkpoints'),
+                keep_last=int(train_cfg.get('keep_last_checkpoints', 3)),
+                enabled=is_main_process()
+            )
+        # Rank 0 records for everyone (ranks run in lockstep); one file per world size keeps baseline runs apart
+        telemetry_cfg = train_cfg.get('telemetry') or {}
+        telemetry = None
+        if telemetry_cfg.get('enabled') and is_main_process():
+            root, ext = os.path.splitext(telemetry_cfg.get('path', 'models/telemetry.jsonl'))
+            telemetry = StepTelemetry(f"{root}_ws{world_size}{ext}", every=int(telemetry_cfg.get('every', 10)))
+        trainer = HateSpeechTrainer(model, train_loader, val_loader, device="cpu",
+                                    lr=float(train_cfg.get('lr', 2e-5)),
+                                    checkpoint_manager=checkpoint_manager,
+                                    checkpoint_every=train_cfg.get('checkpoint_every'),
+                                    telemetry=telemetry)
+
+        start_epoch = 1
+        if args.resume and checkpoint_manager is not None:
+            # Rank 0 may be the only rank that can list files; every rank loads the path it picked
+            resume_path = [checkpoint_manager.latest() if args.resume == "latest" else args.resume]
+            if world_size > 1:
+                torch.distributed.broadcast_object_list(resume_path, src=0)
+            # Every rank got the same answer, so all of them stop together rather than one hanging in DDP
+            if resume_path[0] is None:
+                raise FileNotFoundError(f"Không có checkpoint nào trong {checkpoint_manager.directory}")
+            start_epoch = trainer.resume(resume_path[0])
+
+        for epoch in range(start_epoch, epochs + 1):
+            train_loss, train_acc, train_f1 = trainer.train_one_epoch(epoch, max_steps=args.benchmark_steps)
+            if args.benchmark_steps is not None:
+                continue
+
+            val_loss, val_acc, val_f1 = trainer.evaluate()
+            if is_main_process():
+                print(f"\n--- EPOCH {epoch} KẾT QUẢ (world_size={world_size}) ---")
+                print(f"Train Loss: {train_loss:.4f} | F1: {train_f1:.4f}")
+                print(f"Val   Loss: {val_loss:.4f} | F1: {val_f1:.4f}")
+                print("-" * 50)
+            trainer.save_model(f"models/phobert_epoch_{epoch}.pth")
+            trainer.save_checkpoint(epoch)
+
+        if checkpoint_manager is not None:
+            checkpoint_manager.close()
+        if telemetry is not None:
+            telemetry.close()
+
+        if is_main_process() and result_queue is not None:
+            result_queue.put(trainer.epoch_stats)
+    finally:
+        cleanup_distributed()
+
+
+def launch(args, nproc, world_size, threads):
+    """Spawn nproc local ranks and return rank 0's per-epoch stats (None on non-zero nodes)."""
+    if args.nnodes > 1 and args.master_port is None:
+        raise ValueError("--master-port là bắt buộc khi chạy nhiều node")
+    master_port = args.master_port or find_free_port()
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.SimpleQueue() if args.node_rank == 0 else None
+    mp.spawn(run_worker, args=(args, world_size, master_port, threads, result_queue), nprocs=nproc, join=True)
+    return result_queue.get() if result_queue is not None and not result_queue.empty() else None
+
+
+def mean_throughput(stats):
+    # First epoch includes allocator and thread-pool warmup; prefer later epochs when available
+    usable = stats[1:] if len(stats) > 1 else stats
+    return sum(s['samples_per_sec'] for s in usable) / len(usable)
+
+
+def main():
+    args = parse_args()
+    if config is None:
+        return
+
+    cores = os.cpu_count() or 1
+    world_size = args.nproc * args.nnodes
+    threads = args.threads_per_proc or max(1, cores // args.nproc)
+    print(f"=== DDP CPU: {args.nnodes} node x {args.nproc} tiến trình, {threads} thread/tiến trình ===")
+
+    # Same as main.py --resume: no checkpoint is an error, not a silent fresh start. Checked before any
+    # process is spawned on the node that can see the files; the ranks check again after the broadcast
+    if args.resume == "latest" and args.node_rank == 0 and args.benchmark_steps is None:
+        checkpoint_dir = config.training.get('checkpoint_dir', 'models/checkpoints')
+        if CheckpointManager(checkpoint_dir, enabled=False).latest() is None:
+            print(f"❌ Không có checkpoint nào trong {checkpoint_dir}")
+            return
+
+    os.makedirs("models", exist_ok=True)
+    stats = launch(args, args.nproc, world_size, threads)
+    if stats is None:
+        return
+
+    report = {'world_size': world_size, 'threads_per_proc': threads, 'epochs': stats}
+
+    # Baseline: one process with every core, i.e. what training without DDP would get on this machine.
+    # Always a benchmark run (no checkpoints, no epoch weights): it must not overwrite the DDP run's outputs
+    if args.baseline:
+        benchmark_steps = args.benchmark_steps or DEFAULT_BASELINE_STEPS
+        if args.benchmark_steps is None:
+            print(f"--> Baseline chỉ chạy {benchmark_steps} bước/epoch (--benchmark-steps), không ghi checkpoint")
+        baseline_args = argparse.Namespace(**{**vars(args), 'nproc': 1, 'nnodes': 1, 'node_rank': 0,
+                                              'master_addr': "127.0.0.1", 'master_port': None,
+                                              'benchmark_steps': benchmark_steps, 'resume': None})
+        print(f"\n=== BASELINE: 1 tiến trình x {cores} thread ===")
+        single = mean_throughput(launch(baseline_args, 1, 1, cores))
+        parallel = mean_throughput(stats)
+        speedup = parallel / single if single > 0 else 0.0
+        report.update({
+            'baseline_threads': cores,
+            'baseline_samples_per_sec': single,
+            'samples_per_sec': parallel,
+            'speedup': speedup,
+        })
+        print(f"\n--> Throughput: {parallel:.1f} samples/s (1 tiến trình {cores} thread: {single:.1f})")
+        print(f"--> Speedup so với 1 tiến trình dùng toàn bộ core: {speedup:.2f}x")
+
+        # Optional: one process on a single rank's core slice. parallel / (world_size * that) isolates
+        # DDP communication overhead, but says nothing about beating a whole-machine process
+        if args.slice_baseline:
+            print(f"\n=== BASELINE THEO LÁT: 1 tiến trình x {threads} thread ===")
+            per_slice = mean_throughput(launch(baseline_args, 1, 1, threads))
+            efficiency = parallel / (per_slice * world_size) if per_slice > 0 else 0.0
+            report.update({'slice_baseline_samples_per_sec': per_slice, 'per_slice_efficiency': efficiency})
+            print(f"--> Per-slice efficiency: {efficiency:.1%} (1 lát {per_slice:.1f} samples/s x {world_size})")
+
+    with open("models/ddp_scaling_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("--> Đã ghi báo cáo tại: models/ddp_scaling_report.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import torch
+from sklearn.model_selection import train_test_split
+from torch.utils.data import RandomSampler, SequentialSampler
+from transformers import AutoTokenizer
+
+from src.utils.config_loader import config
+from src.data_layer.data_loader import DataLoader as MyDataLoader
+from src.data_layer.dedup import split_corpus
+from src.services.preprocessing.pipeline import PreprocessingPipeline
+from src.services.tokenization import CachedTokenizer
+from src.services.trainer import HateSpeechTrainer
+from src.services.evaluation import load_classifier, read_best_checkpoint
+from src.core.dataset import HateSpeechDataset, build_data_loader
+from src.models.early_exit import (
+    NEVER_EXIT, EarlyExitClassifier, calibrate_thresholds, collect_exit_probs, simulate_cascade
+)
+
+
+def measure_latency(model: EarlyExitClassifier, batches, early_exit: bool) -> float:
+    """Wall-clock ms per sample over pre-tokenized batches (tokenization excluded)."""
+    samples = 0
+    start = time.perf_counter()
+    with torch.inference_mode():
+        for input_ids, attention_mask in batches:
+            if early_exit:
+                model.forward_with_exits(input_ids, attention_mask)
+            else:
+                model.base(input_ids, attention_mask)
+            samples += input_ids.shape[0]
+    return (time.perf_counter() - start) * 1000 / max(samples, 1)
+
+
+def latency_batches(val_data, tokenizer, max_len: int, batch_size: int, limit: int, device):
+    texts = [str(s.text) for s in val_data[:limit]]
+    encoding = tokenizer.encode_batch(texts, max_len)
+    return [(encoding['input_ids'][i:i + batch_size].to(device),
+             encoding['attention_mask'][i:i + batch_size].to(device))
+            for i in range(0, len(texts), batch_size)]
+
+
+def split_calibration(labels: np.ndarray, seed: int = 42):
+    """Stratified 50/50 split of validation row indices into (calibration, report) halves."""
+    return train_test_split(np.arange(len(labels)), test_size=0.5, random_state=seed, stratify=labels)
+
+
+def main():
+    ee_cfg = (config.training.get('early_exit') or {}) if config else {}
+    parser = argparse.ArgumentParser(description="Huấn luyện đầu ra sớm (early exit) trên PhoBERT đã fine-tune")
+    parser.add_argument("--base", default=None,
+                        help="Checkpoint gốc; mặc định: best_checkpoint.json rồi serving.model_path")
+    parser.add_argument("--exit-layers", type=int, nargs="+", default=ee_cfg.get('exit_layers', [3, 6, 9]))
+    parser.add_argument("--epochs", type=int, default=int(ee_cfg.get('epochs', 2)))
+    parser.add_argument("--lr", type=float, default=float(ee_cfg.get('lr', 1e-3)))
+    parser.add_argument("--tolerance", type=float, default=float(ee_cfg.get('tolerance', 0.005)),
+                        help="Độ chính xác được phép giảm so với model đầy đủ trên các mẫu thoát sớm")
+    parser.add_argument("--sweep", type=float, nargs="+", default=[0.0, 0.005, 0.01, 0.02, 0.05],
+                        help="Các mức tolerance in trong bảng đánh đổi")
+    parser.add_argument("--latency-batch-sizes", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--latency-samples", type=int, default=256)
+    parser.add_argument("--output", default=ee_cfg.get('output_path', "models/phobert_early_exit.pth"))
+    parser.add_argument("--report", default="models/early_exit_report.json")
+    args = parser.parse_args()
+
+    if config is None: return
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    base_path = args.base or read_best_checkpoint() or config.serving.get("model_path", "models/phobert_epoch_3.pth")
+    print(f"--> Checkpoint gốc: {base_path}")
+    base = load_classifier(base_path, device="cpu")
+    # Re-training on top of an early-exit checkpoint starts again from its backbone
+    base = base.base if isinstance(base, EarlyExitClassifier) else base
+    model = EarlyExitClassifier(base, exit_layers=args.exit_layers)
+
+    # Same split as main.py: heads are fit on the base model's training rows, thresholds on its validation rows
+    samples = PreprocessingPipeline().run(MyDataLoader().load_data(config.data.get('train_path')))
+    train_data, val_data, _ = split_corpus(samples, config.data.get('dedup'), test_size=0.2, random_state=42)
+
+    train_cfg = config.training
+    batch_size = int(train_cfg.get('batch_size', 16))
+    max_len = int(train_cfg.get('max_len', 128))
+    tokenizer = CachedTokenizer(AutoTokenizer.from_pretrained("vinai/phobert-base-v2"))
+    train_dataset = HateSpeechDataset(train_data, tokenizer, max_len=max_len)
+    val_dataset = HateSpeechDataset(val_data, tokenizer, max_len=max_len)
+    loader_cfg = train_cfg.get('loader') or {}
+    loader_kwargs = dict(num_workers=int(loader_cfg.get('num_workers', 0)),
+                         prefetch_factor=int(loader_cfg.get('prefetch_factor', 2)))
+    train_loader = build_data_loader(train_dataset, RandomSampler(train_dataset), batch_size,
+                                     **loader_kwargs)
+    val_loader = build_data_loader(val_dataset, SequentialSampler(val_dataset), batch_size, **loader_kwargs)
+
+    # Only the exit heads train (the backbone is frozen), so a much higher LR than fine-tuning is fine
+    model.train_exits = True
+    trainer = HateSpeechTrainer(model, train_loader, val_loader, device=device, lr=args.lr)
+    print(f"\n--> TRAIN {len(model.exit_layers)} đầu ra sớm tại layer {model.exit_layers} ({args.epochs} epochs)...")
+    for epoch in range(1, args.epochs + 1):
+        train_loss, _, _ = trainer.train_one_epoch(epoch)
+        val_loss, _, val_f1 = trainer.evaluate()
+        print(f"Epoch {epoch}: Train Loss {train_loss:.4f} | Val Loss {val_loss:.4f} "
+              f"| F1 layer {model.exit_layers[-1]}: {val_f1:.4f}")
+    model.train_exits = False
+
+    print("\n--> Hiệu chỉnh ngưỡng trên nửa tập val, báo cáo trên nửa còn lại...")
+    exit_probs, final_probs, labels = collect_exit_probs(model, val_loader, trainer.device)
+    # Thresholds are fit on one half and every reported number comes from the other, so the trade-off
+    # table is not scored on the rows the thresholds were tuned on
+    calib_idx, report_idx = split_calibration(labels)
+    calib = (exit_probs[:, calib_idx], final_probs[calib_idx], labels[calib_idx])
+    report = (exit_probs[:, report_idx], final_probs[report_idx], labels[report_idx])
+    print(f"--> Hiệu chỉnh: {len(calib_idx)} câu | báo cáo: {len(report_idx)} câu")
+    per_exit_f1 = {layer: simulate_cascade(report[0][k:k + 1], report[1], report[2], [layer], {layer: 0.0},
+                                           model.n_layers)["macro_f1"]
+                   for k, layer in enumerate(model.exit_layers)}
+
+    bench = {bs: latency_batches(val_data, tokenizer, max_len, bs, args.latency_samples, trainer.device)
+             for bs in args.latency_batch_sizes}
+    model.eval()
+    full = simulate_cascade(*report, model.exit_layers,
+                            {l: NEVER_EXIT for l in model.exit_layers}, model.n_layers)
+    full["latency_ms"] = {bs: measure_latency(model, batches, early_exit=False) for bs, batches in bench.items()}
+
+    rows = []
+    for tolerance in sorted(set(args.sweep) | {args.tolerance}):
+        thresholds = calibrate_thresholds(*calib, model.exit_layers, tolerance=tolerance)
+        result = simulate_cascade(*report, model.exit_layers, thresholds, model.n_layers)
+        model.thresholds = thresholds
+        result["latency_ms"] = {bs: measure_latency(model, batches, early_exit=True) for bs, batches in bench.items()}
+        rows.append({"tolerance": tolerance, "thresholds": thresholds, **result})
+
+    latency_cols = " | ".join(f"{'ms/câu b=' + str(bs):>11}" for bs in args.latency_batch_sizes)
+    print(f"\n{'':<16} | {'macro-F1':>8} | {'layer TB':>8} | {latency_cols} | ngưỡng")
+    print("-" * (56 + 14 * len(args.latency_batch_sizes)))
+
+    def line(name, row, thresholds=""):
+        latency = " | ".join(f"{row['latency_ms'][bs]:>11.2f}" for bs in args.latency_batch_sizes)
+        print(f"{name:<16} | {row['macro_f1']:>8.4f} | {row['avg_layers']:>8.2f} | {latency} | {thresholds}")
+
+    line(f"đầy đủ ({model.n_layers} layer)", full)
+    for row in rows:
+        shown = ", ".join(f"L{l}:{t:.2f}" if t < NEVER_EXIT else f"L{l}:tắt" for l, t in row["thresholds"].items())
+        line(f"tolerance {row['tolerance']:.3f}", row, shown)
+    print("\nF1 từng đầu ra (thoát hết tại đó): "
+          + ", ".join(f"L{l} {f1:.4f}" for l, f1 in per_exit_f1.items()))
+
+    chosen = next(row for row in rows if row["tolerance"] == args.tolerance)
+    model.thresholds = chosen["thresholds"]
+    model.save(args.output, base_checkpoint=base_path)
+    print(f"\n--> Tolerance {args.tolerance}: F1 {chosen['macro_f1']:.4f} (đầy đủ {full['macro_f1']:.4f}), "
+          f"TB {chosen['avg_layers']:.2f}/{model.n_layers} layer, phân bố thoát {chosen['exit_share']}")
+    print(f"--> Đã lưu model early exit tại: {args.output}")
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"base_checkpoint": base_path, "exit_layers": model.exit_layers, "full_model": full,
+                   "per_exit_macro_f1": per_exit_f1, "tradeoff": rows, "chosen_tolerance": args.tolerance,
+                   "calibration_rows": len(calib_idx), "report_rows": len(report_idx)},
+                  f, indent=2)
+    print(f"--> Báo cáo: {args.report}")
+
+
+if __name__ == "__main__":
+    main()